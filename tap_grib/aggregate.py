@@ -0,0 +1,354 @@
+"""Temporal aggregation of message grids into calendar-day or N-hour buckets."""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import tempfile
+import typing as t
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import numpy as np
+
+AGGREGATE_FUNCTIONS = ("min", "mean", "max", "sum", "first", "last")
+
+# header fields carried over to aggregated records (others describe one message)
+BUCKET_FIELDS = (
+    "level_type",
+    "level",
+    "name",
+    "ensemble",
+    "edition",
+    "centre",
+    "data_type",
+    "grid_type",
+)
+
+# header fields describing a single message, absent from aggregated records
+MESSAGE_FIELDS = ("step_range", "step_units", "forecast_step_hours")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_DATETIME_FIELDS = ("run_datetime", "start", "end", "first_at", "last_at", "mtime")
+
+
+def parse_period(period: str) -> int | None:
+    """Bucket length in hours for 'Nh', None for a calendar 'day'."""
+    text = str(period).strip().lower()
+    if text in ("day", "1d"):
+        return None
+    match = re.fullmatch(r"(\d+)h", text)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(
+            f"Invalid aggregate_period '{period}': expected 'day' or e.g. '3h'"
+        )
+    return int(match.group(1))
+
+
+def bucket_bounds(
+    dt: datetime, hours: int | None, tz: ZoneInfo
+) -> tuple[datetime, datetime]:
+    """
+    UTC [start, end) of the bucket holding dt: the calendar day in ``tz``, or
+    the N-hour bin counted from 1970-01-01T00:00Z.
+    """
+    if hours is None:
+        local = dt.astimezone(tz)
+        start = datetime(local.year, local.month, local.day, tzinfo=tz)
+        end = datetime.combine(start.date() + timedelta(days=1), start.time(), tz)
+        return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+    width = timedelta(hours=hours)
+    start = _EPOCH + ((dt - _EPOCH) // width) * width
+    return start, start + width
+
+
+class Bucket:
+    """Running statistics of one field (variable, level, ensemble, grid) over one bucket."""
+
+    def __init__(
+        self,
+        field: str,
+        start: datetime,
+        end: datetime,
+        header: dict[str, t.Any],
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+    ) -> None:
+        lats, lons, vals, regular = grid
+        self.field = field
+        self.start = start
+        self.end = end
+        self.header = {k: header.get(k) for k in BUCKET_FIELDS}
+        self.lats = lats
+        self.lons = lons
+        self.regular = regular
+        self.run_datetime: datetime = header["run_datetime"]
+        self.first_at: datetime | None = None
+        self.last_at: datetime | None = None
+        self.filename: str | None = None
+        self.mtime: datetime | None = None
+        # files (path|mtime) folded in, saved with the bucket
+        self.files: set[str] = set()
+        # valid time -> run of the messages folded in
+        self.runs: dict[str, str] = {}
+
+        size = vals.size
+        self.count = np.zeros(size, dtype=np.int32)
+        self.sum = np.zeros(size, dtype=np.float64)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+        self.first = np.full(size, np.nan)
+        self.last = np.full(size, np.nan)
+
+    def add(
+        self,
+        vals: np.ndarray,
+        at: datetime,
+        run_datetime: datetime,
+        filename: str,
+        mtime: datetime,
+    ) -> None:
+        """Fold the values of one message (valid at ``at``) into the bucket."""
+        valid = ~np.ma.getmaskarray(vals)
+        data = np.where(valid, np.ma.getdata(vals).astype(np.float64), np.nan)
+
+        self.count += valid
+        self.sum += np.where(valid, data, 0.0)
+        np.fmin(self.min, data, out=self.min)
+        np.fmax(self.max, data, out=self.max)
+        if self.first_at is None or at < self.first_at:
+            self.first, self.first_at = data, at
+        if self.last_at is None or at >= self.last_at:
+            self.last, self.last_at = data, at
+
+        self.runs.setdefault(at.isoformat(), run_datetime.isoformat())
+        self.run_datetime = max(self.run_datetime, run_datetime)
+        if self.mtime is None or mtime >= self.mtime:
+            self.filename, self.mtime = filename, mtime
+
+    def statistics(self, functions: t.Iterable[str]) -> dict[str, np.ndarray]:
+        """Arrays of the requested statistics (NaN where no sample)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.count
+        arrays = {
+            "min": self.min,
+            "mean": mean,
+            "max": self.max,
+            "sum": np.where(self.count > 0, self.sum, np.nan),
+            "first": self.first,
+            "last": self.last,
+        }
+        return {name: arrays[name] for name in functions}
+
+    def record(self) -> dict[str, t.Any]:
+        """Record fields shared by every point of the bucket."""
+        return {
+            "run_datetime": self.run_datetime,
+            "interval_start_datetime": self.start,
+            "interval_end_datetime": self.end,
+            **self.header,
+        }
+
+    def save(self, path: str) -> None:
+        meta = {
+            "field": self.field,
+            "header": self.header,
+            "regular": self.regular,
+            "filename": self.filename,
+            "files": sorted(self.files),
+            "runs": self.runs,
+            **{
+                k: (v.isoformat() if v is not None else None)
+                for k in _DATETIME_FIELDS
+                for v in [getattr(self, k)]
+            },
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(
+                fh,
+                meta=np.array(json.dumps(meta)),
+                lats=self.lats,
+                lons=self.lons,
+                count=self.count,
+                sum=self.sum,
+                min=self.min,
+                max=self.max,
+                first=self.first,
+                last=self.last,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Bucket:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            bucket = cls.__new__(cls)
+            bucket.field = meta["field"]
+            bucket.header = meta["header"]
+            bucket.regular = meta["regular"]
+            bucket.filename = meta["filename"]
+            bucket.files = set(meta.get("files", []))
+            bucket.runs = meta.get("runs", {})
+            for k in _DATETIME_FIELDS:
+                value = meta.get(k)
+                setattr(bucket, k, datetime.fromisoformat(value) if value else None)
+            for k in ("lats", "lons", "count", "sum", "min", "max", "first", "last"):
+                setattr(bucket, k, data[k])
+        return bucket
+
+
+class TemporalAggregator:
+    """
+    Open buckets of a stream, keyed by field and bucket start.
+
+    A bucket closes once a message of the same field starting at or after its
+    end has been read (its watermark). Open buckets are written to
+    ``directory`` and listed in the stream state, so buckets spanning files
+    and syncs keep accumulating; messages for an already closed bucket are
+    dropped.
+
+    Buckets are keyed by field and time only: messages of overlapping forecast
+    runs valid at the same time are all folded in (a warning is logged once
+    per field), so forecast data should be read with ``latest_run_only``.
+
+    Saved buckets may run ahead of the last emitted state: each remembers the
+    files folded into it, so a file replayed after a crash is not counted
+    twice, and the files of closed buckets are only removed once the state
+    no longer lists them as open.
+    """
+
+    STATE_KEY = "aggregates"
+
+    def __init__(
+        self,
+        state: dict[str, t.Any],
+        directory: str,
+        period: str,
+        tz: str | None = None,
+        functions: t.Iterable[str] | None = None,
+        logger: t.Any = None,
+    ) -> None:
+        self.hours = parse_period(period)
+        self.tz = ZoneInfo(tz or "UTC")
+        self.functions = list(functions or ("min", "mean", "max"))
+        self.directory = directory
+        self.logger = logger
+        os.makedirs(directory, exist_ok=True)
+
+        self._state = state.setdefault(
+            self.STATE_KEY, {"open": [], "watermarks": {}, "closed_until": {}}
+        )
+        self.watermarks: dict[str, str] = self._state["watermarks"]
+        self.closed_until: dict[str, str] = self._state["closed_until"]
+        self.buckets: dict[str, Bucket] = {}
+        self._dirty: set[str] = set()
+        # (bucket, file) pairs folded since the last save
+        self._feeding: set[tuple[str, str]] = set()
+        # fields already warned about for overlapping runs
+        self._overlapping: set[str] = set()
+        for bucket_id in self._state["open"]:
+            try:
+                self.buckets[bucket_id] = Bucket.load(self._path(bucket_id))
+            except (OSError, ValueError, KeyError) as e:
+                if self.logger:
+                    self.logger.warning(f"Lost open bucket {bucket_id}: {e}")
+        # closed by a sync whose state was emitted: their files can go
+        for bucket_id in self._state.pop("closed", []):
+            if bucket_id not in self.buckets:
+                self._remove(bucket_id)
+        self._closed: list[str] = []
+
+    def _path(self, bucket_id: str) -> str:
+        name = hashlib.sha1(bucket_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def _remove(self, bucket_id: str) -> None:
+        try:
+            os.remove(self._path(bucket_id))
+        except OSError:
+            pass
+
+    def add(
+        self,
+        field: str,
+        header: dict[str, t.Any],
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        filename: str,
+        mtime: datetime,
+    ) -> bool:
+        """
+        Fold a decoded message into its bucket, unless the bucket was saved
+        with the file already folded in. False if the bucket is closed.
+        """
+        at: datetime = header["interval_start_datetime"]
+        closed = self.closed_until.get(field)
+        if closed is not None and at < datetime.fromisoformat(closed):
+            return False
+
+        start, end = bucket_bounds(at, self.hours, self.tz)
+        bucket_id = f"{field}|{start.isoformat()}"
+        file_id = f"{filename}|{mtime.isoformat()}"
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = Bucket(field, start, end, header, grid)
+            self.buckets[bucket_id] = bucket
+        if file_id not in bucket.files or (bucket_id, file_id) in self._feeding:
+            run = bucket.runs.get(at.isoformat())
+            run_datetime: datetime = header["run_datetime"]
+            if run is not None and run != run_datetime.isoformat():
+                self._warn_overlapping(field, at)
+            bucket.add(grid[2], at, run_datetime, filename, mtime)
+            bucket.files.add(file_id)
+            self._feeding.add((bucket_id, file_id))
+            self._dirty.add(bucket_id)
+
+        watermark = self.watermarks.get(field)
+        if watermark is None or at > datetime.fromisoformat(watermark):
+            self.watermarks[field] = at.isoformat()
+        return True
+
+    def _warn_overlapping(self, field: str, at: datetime) -> None:
+        if field in self._overlapping or not self.logger:
+            return
+        self._overlapping.add(field)
+        self.logger.warning(
+            f"Aggregating {field}: several runs are valid at {at.isoformat()} "
+            "and are folded into the same bucket; set latest_run_only to keep "
+            "only the newest run"
+        )
+
+    def pop_closed(self, until: datetime | None = None) -> t.Iterator[Bucket]:
+        """
+        Remove and yield the buckets whose field watermark reached their end,
+        and every bucket starting before ``until`` (the exclusive end of a
+        finite backfill, past which no message is read to move the watermark).
+        """
+        for bucket_id, bucket in sorted(
+            self.buckets.items(), key=lambda item: item[1].start
+        ):
+            watermark = self.watermarks.get(bucket.field)
+            reached = watermark is not None and (
+                datetime.fromisoformat(watermark) >= bucket.end
+            )
+            if not reached and (until is None or bucket.start >= until):
+                continue
+            del self.buckets[bucket_id]
+            self._dirty.discard(bucket_id)
+            closed = self.closed_until.get(bucket.field)
+            if closed is None or datetime.fromisoformat(closed) < bucket.end:
+                self.closed_until[bucket.field] = bucket.end.isoformat()
+            self._closed.append(bucket_id)
+            yield bucket
+
+    def save(self) -> None:
+        """
+        Persist the open buckets changed since the last save. Closed buckets
+        keep their file until the next sync, in case this state is never emitted.
+        """
+        for bucket_id in self._dirty:
+            self.buckets[bucket_id].save(self._path(bucket_id))
+        self._dirty.clear()
+        self._feeding.clear()
+        self._state["open"] = sorted(self.buckets)
+        self._state["closed"] = sorted(set(self._closed) - set(self.buckets))
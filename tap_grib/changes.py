@@ -0,0 +1,189 @@
+"""Local store of last emitted value arrays, for change-only emission."""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import time
+import typing as t
+import numpy as np
+
+
+def changed_mask(
+    new: np.ndarray,
+    old: np.ndarray | None,
+    abs_tolerance: float = 0.0,
+    rel_tolerance: float = 0.0,
+) -> np.ndarray:
+    """
+    Boolean mask of points of ``new`` that differ from ``old`` by more than
+    ``abs_tolerance + rel_tolerance * |old|``. Every point is changed when
+    there is nothing to compare against (or the grids differ in size).
+    """
+    new_data = np.ma.filled(np.ma.asarray(new), np.nan)
+    if old is None or old.shape != new_data.shape:
+        return np.ones(new_data.shape, dtype=bool)
+    same = np.isclose(
+        new_data, old, rtol=rel_tolerance, atol=abs_tolerance, equal_nan=True
+    )
+    return ~same
+
+
+class ChangeStore:
+    """
+    Last emitted value array per field, one ``.npy`` file each, in ``directory``.
+
+    Each entry remembers the file (``path|mtime``) that wrote it and keeps the
+    array it replaced: the store is written before the stream state marks the
+    file as read, so a file read again after an interrupted sync is compared
+    against the values emitted before it, not against its own.
+
+    Entries are evicted least-recently-used first once the store holds more than
+    ``max_entries`` arrays or ``max_bytes`` bytes.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int | None = 1000,
+        max_bytes: int | None = None,
+    ) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._index: dict[str, dict[str, t.Any]] = self._load_index()
+        # entries written by this process
+        self._written: set[str] = set()
+
+    def _load_index(self) -> dict[str, dict[str, t.Any]]:
+        try:
+            with open(
+                os.path.join(self.directory, self.INDEX_FILE), encoding="utf-8"
+            ) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save_index(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._index, fh)
+        os.replace(tmp_path, os.path.join(self.directory, self.INDEX_FILE))
+
+    @staticmethod
+    def _entry_id(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, entry_id: str, previous: bool = False) -> str:
+        suffix = ".prev.npy" if previous else ".npy"
+        return os.path.join(self.directory, f"{entry_id}{suffix}")
+
+    def _replayed(self, entry_id: str, source: str | None) -> bool:
+        """True if source wrote the entry in an earlier, interrupted sync."""
+        entry = self._index.get(entry_id)
+        return (
+            entry is not None
+            and source is not None
+            and entry.get("file") == source
+            and entry_id not in self._written
+        )
+
+    def get(self, key: str, source: str | None = None) -> np.ndarray | None:
+        """
+        Return the array to compare values read from ``source`` against for
+        key (marking it used), None if unknown: the stored array, or the one
+        it replaced if ``source`` wrote it in an interrupted sync.
+        """
+        entry_id = self._entry_id(key)
+        entry = self._index.get(entry_id)
+        if entry is None:
+            return None
+        previous = self._replayed(entry_id, source)
+        if previous and not entry.get("previous"):
+            return None
+        try:
+            values = np.load(self._entry_path(entry_id, previous), mmap_mode="r")
+        except (OSError, ValueError):
+            self._index.pop(entry_id, None)
+            return None
+        entry["used"] = time.time()
+        return values
+
+    def changed(
+        self,
+        key: str,
+        values: np.ndarray,
+        abs_tolerance: float = 0.0,
+        rel_tolerance: float = 0.0,
+        source: str | None = None,
+    ) -> np.ndarray:
+        """Mask of points changed since the array last emitted for key."""
+        return changed_mask(values, self.get(key, source), abs_tolerance, rel_tolerance)
+
+    def put(
+        self,
+        key: str,
+        values: np.ndarray,
+        changed: np.ndarray | None = None,
+        source: str | None = None,
+    ) -> None:
+        """
+        Store the values emitted for key (missing points as NaN): ``values``
+        where ``changed`` (all if None), the array compared against elsewhere.
+        Evicts if over limits.
+        """
+        entry_id = self._entry_id(key)
+        data = np.ma.filled(np.ma.asarray(values), np.nan)
+        old = self.get(key, source) if changed is not None else None
+        if changed is not None and old is not None and old.shape == data.shape:
+            data = np.where(changed & ~np.isnan(data), data, old)
+
+        entry = self._index.get(entry_id)
+        has_previous = False
+        if entry is not None and source is not None and entry.get("file") == source:
+            # same file again: keep the array it replaced
+            has_previous = bool(entry.get("previous"))
+        elif entry is not None and os.path.exists(self._entry_path(entry_id)):
+            os.replace(self._entry_path(entry_id), self._entry_path(entry_id, True))
+            has_previous = True
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, data)
+        os.replace(tmp_path, self._entry_path(entry_id))
+
+        self._index[entry_id] = {
+            "bytes": int(data.nbytes) * (2 if has_previous else 1),
+            "used": time.time(),
+            "file": source,
+            "previous": has_previous,
+        }
+        self._written.add(entry_id)
+        self._evict(keep=entry_id)
+        self._save_index()
+
+    def _evict(self, keep: str) -> None:
+        entries = sorted(self._index.items(), key=lambda item: item[1].get("used", 0))
+        total = sum(e.get("bytes", 0) for _, e in entries)
+
+        for entry_id, entry in entries:
+            over_count = (
+                self.max_entries is not None and len(self._index) > self.max_entries
+            )
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            if entry_id == keep:
+                continue
+            del self._index[entry_id]
+            total -= entry.get("bytes", 0)
+            for previous in (False, True):
+                try:
+                    os.remove(self._entry_path(entry_id, previous))
+                except OSError:
+                    pass
@@ -3,11 +3,37 @@ from datetime import datetime, timezone, timedelta
 from singer_sdk.streams import Stream
 from singer_sdk import typing as th
 import typing as t
-from tap_grib.storage import Storage
+from tap_grib.aggregate import (
+    AGGREGATE_FUNCTIONS,
+    MESSAGE_FIELDS,
+    Bucket,
+    TemporalAggregator,
+    bucket_bounds,
+    parse_period,
+)
+from tap_grib.changes import ChangeStore
+from tap_grib.regrid import Regridder
+from tap_grib.storage import (
+    FileInfo,
+    ListingCache,
+    Storage,
+    compression_from_magic,
+    compression_from_name,
+)
+
+if t.TYPE_CHECKING:
+    from tap_grib.split import FileSplitter
+import copy
 import tempfile
-import shutil
 import os
-import pygrib
+import json
+import time
+import re
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 SDC_INCREMENTAL_KEY = "_sdc_last_modified"
 SDC_FILENAME = "_sdc_filename"
@@ -83,6 +109,421 @@ def _extract_grid(msg: t.Any):
     return lats.ravel(), lons.ravel(), vals.ravel()
 
 
+def _regular_ll_axes(msg: t.Any) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Return the 1-D (lats, lons) axes of a regular lat/lon grid in scan order.
+    None for any other grid (or scanning mode) so callers fall back to latlons().
+    """
+    if safe_get(msg, "gridType", None) != "regular_ll":
+        return None
+    if safe_get(msg, "jPointsAreConsecutive", 0):
+        return None
+
+    lats = safe_get(msg, "distinctLatitudes", None)
+    lons = safe_get(msg, "distinctLongitudes", None)
+    ni = safe_get(msg, "Ni", None)
+    nj = safe_get(msg, "Nj", None)
+    lat0 = safe_get(msg, "latitudeOfFirstGridPointInDegrees", None)
+    lon0 = safe_get(msg, "longitudeOfFirstGridPointInDegrees", None)
+    if lats is None or lons is None or lat0 is None or lon0 is None:
+        return None
+
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    if lats.size != nj or lons.size != ni:
+        return None
+
+    # distinct* keys may come sorted rather than in scan order
+    if lats.size > 1 and not np.isclose(lats[0], lat0):
+        lats = lats[::-1]
+    if lons.size > 1 and not np.isclose(lons[0] % 360, lon0 % 360):
+        lons = lons[::-1]
+    if not np.isclose(lats[0], lat0) or not np.isclose(lons[0] % 360, lon0 % 360):
+        return None
+
+    return lats, lons
+
+
+def _decode_grid(
+    msg: t.Any, dtype: t.Any = np.float64
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """
+    Decode a message into (lats, lons, vals, regular).
+
+    ``vals`` is 1-D and keeps the GRIB missing-value mask when there is one.
+    For regular lat/lon grids (``regular`` True) lats/lons are only the 1-D
+    grid axes, otherwise they are full 1-D coordinate arrays like ``vals``.
+    """
+    axes = _regular_ll_axes(msg)
+    if axes is None:
+        lats, lons, vals = _extract_grid(msg)
+        return lats, lons, vals.astype(dtype, copy=False), False
+
+    vals = np.ma.ravel(np.ma.atleast_1d(msg.values))
+    return axes[0], axes[1], vals.astype(dtype, copy=False), True
+
+
+def _iter_grid_chunks(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    vals: np.ndarray,
+    regular: bool,
+    max_points: int | None = None,
+) -> t.Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield (lats, lons, vals) blocks of at most ``max_points`` points from a
+    decoded grid. On regular grids block coordinates are derived from the
+    axes, so the full coordinate meshgrid is never built.
+    """
+    size = vals.size
+    step = max_points if max_points and max_points > 0 else max(size, 1)
+
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        if regular:
+            row, col = np.divmod(np.arange(start, stop), lons.size)
+            yield lats[row], lons[col], vals[start:stop]
+        else:
+            yield lats[start:stop], lons[start:stop], vals[start:stop]
+
+
+# minimum bytes fetched per ranged read of headers: enough for the sections
+# before the data section of most messages, or for many small messages at once
+_HEAD_READ_BYTES = 64 << 10
+
+# stored bytes read to sample the transfer (and decompression) throughput
+_TRANSFER_SAMPLE_BYTES = 4 << 20
+
+
+def _message_length(section0: bytes) -> int:
+    """Total length of the GRIB message starting with this indicator section."""
+    edition = section0[7]
+    if edition == 1:
+        length = int.from_bytes(section0[4:7], "big")
+        if length & 0x800000:
+            raise ValueError("GRIB1 large-message length encoding")
+        return length
+    if edition == 2:
+        return int.from_bytes(section0[8:16], "big")
+    raise ValueError(f"unknown GRIB edition {edition}")
+
+
+def _data_section_offset(head: bytes, length: int) -> tuple[int | None, int]:
+    """
+    (offset of the data section, None if ``head`` is too short to tell;
+    bytes of the message needed to get further) from its leading bytes.
+    """
+    if head[7] == 1:
+        # sections 1 (product), 2 (grid, optional), 3 (bitmap, optional)
+        if len(head) < 16:
+            return None, 16
+        pos = 8 + int.from_bytes(head[8:11], "big")
+        flags = head[15]
+        for present in (flags & 0x80, flags & 0x40):
+            if not present:
+                continue
+            if len(head) < pos + 3:
+                return None, pos + 3
+            pos += int.from_bytes(head[pos : pos + 3], "big")
+        return pos, pos
+
+    pos = 16
+    while True:
+        if len(head) < pos + 5:
+            return None, pos + 5
+        size = int.from_bytes(head[pos : pos + 4], "big")
+        if head[pos : pos + 4] == b"7777" or size < 5:
+            raise ValueError("GRIB2 message without data section")
+        if head[pos + 4] == 7:
+            # a single field per message: the end section follows the data
+            if pos + size != length - 4:
+                raise ValueError("GRIB2 message with several fields")
+            return pos, pos
+        pos += size
+
+
+def _header_only_message(head: bytes, data_offset: int) -> bytes:
+    """
+    The message starting ``head`` with an empty data section: header sections
+    (and bitmap) are kept, so pygrib reads every header key and the missing
+    point count, but not the packed values.
+    """
+    if head[7] == 1:
+        # length 12, no unused bits, zero scale and reference, 0 bits per value
+        data = (12).to_bytes(3, "big") + bytes(9)
+        total = data_offset + len(data) + 4
+        return b"GRIB" + total.to_bytes(3, "big") + head[7:data_offset] + data + b"7777"
+    data = (5).to_bytes(4, "big") + b"\x07"
+    total = data_offset + len(data) + 4
+    return head[:8] + total.to_bytes(8, "big") + head[16:data_offset] + data + b"7777"
+
+
+class _RangeBuffer:
+    """
+    Forward-only window over a file read by range: bytes already fetched are
+    reused by the following reads and never fetched twice.
+    """
+
+    def __init__(self, storage: Storage, path: str, size: int) -> None:
+        self.storage = storage
+        self.path = path
+        self.size = size
+        self.start = 0
+        self.data = b""
+
+    def read(self, start: int, end: int, limit: int) -> bytes:
+        """
+        Buffered bytes from ``start`` up to ``limit``, at least up to ``end``
+        (file end permitting). Missing bytes are fetched in one request of at
+        least _HEAD_READ_BYTES, never past ``limit``.
+        """
+        limit = min(limit, self.size)
+        buffered = self.start + len(self.data)
+        if start < self.start or start > buffered:
+            self.start, self.data = start, b""
+        else:
+            self.start, self.data = start, self.data[start - self.start :]
+        buffered = self.start + len(self.data)
+        if buffered < min(end, limit):
+            stop = min(limit, max(end, buffered + _HEAD_READ_BYTES))
+            self.data += self.storage.read_range(self.path, buffered, stop)
+        return self.data[: limit - start]
+
+
+def _iter_message_frames(buffer: _RangeBuffer) -> t.Iterator[tuple[int, int, bytes]]:
+    """
+    (offset, length, leading bytes already buffered) of every GRIB message of
+    a file, from its indicator section, skipping padding between messages.
+    Raises ValueError if the layout cannot be read this way.
+    """
+    size = buffer.size
+    pos = 0
+    while pos < size:
+        head = buffer.read(pos, pos + 16, size)
+        if head[:4] != b"GRIB":
+            if pos == 0 and compression_from_magic(head[:4]):
+                raise ValueError("compressed file")
+            # padding between messages: look for the next indicator
+            found = head.find(b"GRIB", 1)
+            if found < 0:
+                if pos + len(head) >= size:
+                    break
+                pos += len(head) - 3
+                continue
+            pos += found
+            continue
+
+        if len(head) < 16:
+            raise ValueError("truncated GRIB message")
+        length = _message_length(head)
+        yield pos, length, head[:length]
+        pos += length
+
+
+def iter_message_heads(
+    storage: Storage, path: str, size: int
+) -> t.Iterator[tuple[int, int, bytes]]:
+    """
+    (offset, length, header-only message) of every message of an uncompressed
+    file, fetching with ranged reads only the bytes before each data section
+    (consecutive small messages come from the same request; no byte is
+    fetched twice). Raises ValueError if the layout cannot be read this way.
+    """
+    buffer = _RangeBuffer(storage, path, size)
+    for pos, length, head in _iter_message_frames(buffer):
+        data_offset, needed = _data_section_offset(head, length)
+        while data_offset is None:
+            if len(head) >= length or pos + needed > size:
+                raise ValueError("truncated GRIB message")
+            head = buffer.read(pos, pos + needed, pos + length)
+            data_offset, needed = _data_section_offset(head, length)
+        yield pos, length, _header_only_message(head, data_offset)
+
+
+def _scan_message_offsets(path: str) -> list[tuple[int, int]] | None:
+    """
+    Byte (offset, length) of every GRIB message in a local file, reading only
+    each indicator section. None if the layout cannot be indexed this way (e.g.
+    GRIB1 messages using the large-message length encoding).
+    """
+    offsets: list[tuple[int, int]] = []
+    buffer = _RangeBuffer(Storage(path), path, os.path.getsize(path))
+    try:
+        with open(path, "rb") as fh:
+            for pos, length, _ in _iter_message_frames(buffer):
+                fh.seek(pos + length - 4)
+                if length < 16 or fh.read(4) != b"7777":
+                    return None
+                offsets.append((pos, length))
+    except ValueError:
+        return None
+    return offsets
+
+
+def _decode_message_at(
+    path: str, offset: int, length: int, dtype: t.Any = np.float64
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """Worker entry point: decode the message stored at offset in a local file."""
+    import pygrib
+
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        msg = pygrib.fromstring(fh.read(length))
+    return _decode_grid(msg, dtype)
+
+
+def _ordered_results(
+    pool: Executor,
+    fn: t.Callable[..., t.Any],
+    calls: t.Iterable[tuple[t.Any, tuple]],
+    window: int,
+) -> t.Iterator[tuple[t.Any, Future]]:
+    """
+    Submit (tag, args) calls to pool as they are produced, keeping at most
+    ``window`` in flight, and yield (tag, future) in submission order, so
+    results stream back in order with bounded memory.
+    """
+    pending: deque[tuple[t.Any, Future]] = deque()
+    for tag, args in calls:
+        pending.append((tag, pool.submit(fn, *args)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _bbox_mask(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    bboxes: list[tuple[float, float, float, float]],
+) -> np.ndarray:
+    """Boolean mask of points inside any (min_lon, min_lat, max_lon, max_lat) bbox."""
+    keep = np.zeros(lats.shape, dtype=bool)
+    for min_lon, min_lat, max_lon, max_lat in bboxes:
+        keep |= (
+            (lons >= min_lon)
+            & (lons <= max_lon)
+            & (lats >= min_lat)
+            & (lats <= max_lat)
+        )
+    return keep
+
+
+def _count_points(
+    msg: t.Any, bboxes: list[tuple[float, float, float, float]] | None
+) -> int:
+    """
+    Points a message would emit, from grid metadata only (values are not
+    decoded). Without bboxes missing points are excluded; inside bboxes they
+    are not known without decoding, so the count is an upper bound.
+    """
+    if not bboxes:
+        total = int(safe_get(msg, "numberOfDataPoints", 0) or 0)
+        missing = int(safe_get(msg, "numberOfMissing", 0) or 0)
+        return max(total - missing, 0)
+
+    axes = _regular_ll_axes(msg)
+    if axes is not None:
+        lat_axis, lon_axis = axes
+        inside = np.zeros((lat_axis.size, lon_axis.size), dtype=bool)
+        for min_lon, min_lat, max_lon, max_lat in bboxes:
+            lat_in = (lat_axis >= min_lat) & (lat_axis <= max_lat)
+            lon_in = (lon_axis >= min_lon) & (lon_axis <= max_lon)
+            inside |= np.outer(lat_in, lon_in)
+        return int(inside.sum())
+
+    # other grids: coordinates are computed from the grid definition
+    lats, lons = msg.latlons()
+    return int(_bbox_mask(np.ravel(lats), np.ravel(lons), bboxes).sum())
+
+
+def _reset_peak_rss() -> None:
+    """Restart the peak resident set size (VmHWM) count of this process (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> int | None:
+    """
+    Peak resident set size of this process since the last reset (or start),
+    None where unsupported.
+    """
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+def _in_window(dt: datetime, start: datetime | None, end: datetime | None) -> bool:
+    """True if dt falls in the half-open window [start, end) (open bounds if None)."""
+    return (start is None or dt >= start) and (end is None or dt < end)
+
+
+# Filename timestamp tokens, from coarsest to finest
+_TEMPLATE_TOKENS = {
+    "YYYY": r"(?P<year>\d{4})",
+    "MM": r"(?P<month>\d{2})",
+    "DD": r"(?P<day>\d{2})",
+    "HH": r"(?P<hour>\d{2})",
+}
+
+
+@lru_cache(maxsize=None)
+def _template_regex(template: str) -> re.Pattern[str]:
+    """
+    Compile a filename template such as ``era5_{YYYYMMDD}.grib`` into a regex.
+    Braces hold YYYY/MM/DD/HH tokens, ``*`` and ``?`` outside braces act as globs.
+    """
+    parts: list[str] = []
+    for literal, field in re.findall(r"([^{]*)(?:\{([^}]*)\})?", template):
+        parts.append(re.escape(literal).replace(r"\*", ".*").replace(r"\?", "."))
+        for token in re.findall(r"YYYY|MM|DD|HH|.", field):
+            parts.append(_TEMPLATE_TOKENS.get(token, re.escape(token)))
+    return re.compile("".join(parts) + "$")
+
+
+def filename_datetime_span(
+    path: str, template: str
+) -> tuple[datetime, datetime] | None:
+    """
+    Return the [start, end) UTC span encoded in a file name by ``template``,
+    sized by its finest token (e.g. one day for YYYYMMDD). None if it does not match.
+    """
+    match = _template_regex(template).match(os.path.basename(path))
+    if match is None:
+        return None
+
+    parts = match.groupdict()
+    year = int(parts["year"]) if parts.get("year") else None
+    if year is None:
+        return None
+    month = int(parts["month"]) if parts.get("month") else None
+    day = int(parts["day"]) if parts.get("day") else None
+    hour = int(parts["hour"]) if parts.get("hour") else None
+
+    try:
+        start = datetime(year, month or 1, day or 1, hour or 0, tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+    if hour is not None:
+        end = start + timedelta(hours=1)
+    elif day is not None:
+        end = start + timedelta(days=1)
+    elif month is not None:
+        end = start.replace(year=year + month // 12, month=month % 12 + 1)
+    else:
+        end = start.replace(year=year + 1)
+    return start, end
+
+
 def _compute_run_datetime(msg: t.Any) -> datetime | None:
     """
     Authoritative run time:
@@ -187,6 +628,176 @@ def _compute_forecast_step_hours(msg: t.Any) -> float | None:
     return None
 
 
+# grid definition keys identifying a geometry when md5GridSection is unavailable
+_GRID_KEYS = (
+    "gridType",
+    "Ni",
+    "Nj",
+    "N",
+    "numberOfDataPoints",
+    "latitudeOfFirstGridPointInDegrees",
+    "longitudeOfFirstGridPointInDegrees",
+    "latitudeOfLastGridPointInDegrees",
+    "longitudeOfLastGridPointInDegrees",
+    "iDirectionIncrementInDegrees",
+    "jDirectionIncrementInDegrees",
+    "iScansNegatively",
+    "jScansPositively",
+    "latitudeOfSouthernPoleInDegrees",
+    "longitudeOfSouthernPoleInDegrees",
+    "angleOfRotationInDegrees",
+    "LaDInDegrees",
+    "LoVInDegrees",
+    "Latin1InDegrees",
+    "Latin2InDegrees",
+    "DxInMetres",
+    "DyInMetres",
+    "shapeOfTheEarth",
+)
+
+
+def _grid_id(msg: t.Any) -> str:
+    """Identify the grid geometry of a message."""
+    grid_md5 = safe_get(msg, "md5GridSection", None)
+    if grid_md5:
+        return str(grid_md5)
+    return ":".join(str(safe_get(msg, k, "")) for k in _GRID_KEYS)
+
+
+def _field_key(header: dict[str, t.Any]) -> str:
+    """Identify a field independently of its run: variable, level, member, interval."""
+    parts = [
+        header.get("name"),
+        header.get("level_type"),
+        header.get("level"),
+        header.get("ensemble"),
+        to_iso8601(header["interval_start_datetime"]),
+        to_iso8601(header["interval_end_datetime"]),
+    ]
+    return "|".join("" if p is None else str(p) for p in parts)
+
+
+@contextmanager
+def local_copy(
+    storage: Storage, path: str, logger: t.Any, label: str
+) -> t.Iterator[str]:
+    """
+    Copy a (possibly remote, possibly compressed) file to a temporary local
+    path for pygrib, removed on exit.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".grib") as tmp:
+        tmp_path = tmp.name
+        try:
+            stats = storage.copy_to(path, tmp)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp_path)
+            raise
+
+    if stats.compression:
+        logger.info(
+            "[%s] Decompressed %s (%s): %d -> %d bytes in %.2fs",
+            label,
+            path,
+            stats.compression,
+            stats.compressed_bytes,
+            stats.uncompressed_bytes,
+            stats.seconds,
+        )
+    try:
+        yield tmp_path
+    finally:
+        try:
+            os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+class _SyncRun:
+    """What a sync reads: set up once, then shared by every file."""
+
+    def __init__(
+        self,
+        bookmark_dt: datetime | None,
+        files: list[FileInfo],
+        latest: "_LatestRuns | None",
+        aggregator: TemporalAggregator | None,
+    ) -> None:
+        self.bookmark_dt = bookmark_dt
+        self.files = files
+        self.latest = latest
+        self.aggregator = aggregator
+
+
+class _LatestRuns:
+    """
+    Newest run per field, from a header-only inventory of the files to sync.
+
+    Runs already emitted are kept in the stream state (``latest_runs``), so a
+    field is emitted again only when a run at least as new as the last one
+    shows up; a newer run supersedes the previously emitted one.
+    """
+
+    STATE_KEY = "latest_runs"
+
+    def __init__(self, state: dict[str, t.Any]) -> None:
+        self.emitted: dict[str, str] = state.setdefault(self.STATE_KEY, {})
+        self.winners: dict[str, datetime] = {}
+        self._file_fields: dict[str, set[tuple[str, datetime]]] = {}
+
+    def offer(self, path: str, header: dict[str, t.Any]) -> None:
+        key = _field_key(header)
+        run_dt = header["run_datetime"]
+        self._file_fields.setdefault(path, set()).add((key, run_dt))
+        if key not in self.winners or run_dt > self.winners[key]:
+            self.winners[key] = run_dt
+
+    def _is_new(self, key: str, run_dt: datetime) -> bool:
+        previous = parse_bookmark(self.emitted.get(key))
+        return previous is None or run_dt >= previous
+
+    @property
+    def superseded(self) -> int:
+        """Number of previously emitted fields replaced by a newer run."""
+        count = 0
+        for key, run_dt in self.winners.items():
+            previous = parse_bookmark(self.emitted.get(key))
+            if previous is not None and run_dt > previous:
+                count += 1
+        return count
+
+    def has_winners(self, path: str) -> bool:
+        """False only if the inventory saw the file and none of its runs wins."""
+        fields = self._file_fields.get(path)
+        if fields is None:
+            return True
+        return any(
+            self.winners[key] == run_dt and self._is_new(key, run_dt)
+            for key, run_dt in fields
+        )
+
+    def is_winner(self, header: dict[str, t.Any]) -> bool:
+        key = _field_key(header)
+        run_dt = header["run_datetime"]
+        winner = self.winners.get(key)
+        return (winner is None or run_dt == winner) and self._is_new(key, run_dt)
+
+    def mark_emitted(self, header: dict[str, t.Any]) -> None:
+        self.emitted[_field_key(header)] = to_iso8601(header["run_datetime"])
+
+    def prune(self) -> None:
+        """Forget fields whose interval ended before anything in this inventory."""
+        if not self.winners:
+            return
+        earliest = min(key.rsplit("|", 2)[-2] for key in self.winners)
+        for key in [k for k in self.emitted if k.rsplit("|", 1)[-1] < earliest]:
+            del self.emitted[key]
+
+
+# (header, points, grid id) of a message scanned by GribStream.plan
+_PlanMessage = tuple[dict[str, t.Any], int, t.Optional[str]]
+
+
 class GribStream(Stream):
     """Stream that reads records from a GRIB file in normalized (long) format, with interval semantics."""
 
@@ -220,18 +831,52 @@ class GribStream(Stream):
         skip_past: bool | None = False,
         ignore_fields: set[str] | None = None,
         extra_files: list[str] | None = None,
+        file_infos: list[FileInfo] | None = None,
         bboxes: list[tuple[float, float, float, float]] | None = None,
+        max_points_per_chunk: int | None = None,
+        use_float32: bool | None = False,
+        file_pattern: str | None = None,
+        listing_cache: ListingCache | None = None,
+        run_datetime_start: str | None = None,
+        run_datetime_end: str | None = None,
+        interval_datetime_start: str | None = None,
+        interval_datetime_end: str | None = None,
+        filename_datetime_template: str | None = None,
+        filename_datetime_kind: str | None = None,
+        latest_run_only: bool | None = False,
+        change_store: ChangeStore | None = None,
+        change_abs_tolerance: float | None = None,
+        change_rel_tolerance: float | None = None,
+        decode_workers: int | None = None,
+        aggregate_period: str | None = None,
+        aggregate_timezone: str | None = None,
+        aggregate_functions: list[str] | None = None,
+        aggregate_store_path: str | None = None,
+        aggregate_flush: bool | None = False,
+        target_resolution: float | None = None,
+        regrid_method: str | None = None,
+        splitter: "FileSplitter | None" = None,
+        split_key: str | None = None,
         **kwargs,
     ):
         super().__init__(tap=tap, name=name, **kwargs)
 
         self.file_path = file_path
         self.extra_files = extra_files or ([file_path] if file_path else [])
+        # without an explicit file list, the pattern is listed at sync time
+        self.file_pattern = file_pattern
+        self.listing_cache = listing_cache
+        # files already listed with their metadata (split sub-streams)
+        self.file_infos = file_infos
 
         self.primary_keys = primary_keys or self.DEFAULT_PKEY
         self.bboxes = bboxes
         self.skip_past = bool(skip_past)
 
+        # bounded-memory decoding: process each message in blocks of points
+        self.max_points_per_chunk = max_points_per_chunk or None
+        self.value_dtype = np.float32 if use_float32 else np.float64
+
         # parse skip_past_reference
         ref_dt: datetime | None = None
         if skip_past_reference:
@@ -245,6 +890,75 @@ class GribStream(Stream):
                 )
         self.skip_past_reference: datetime | None = ref_dt
 
+        # [start, end) windows, evaluated on message headers before decoding
+        self.run_window = (
+            self._parse_window_bound("run_datetime_start", run_datetime_start),
+            self._parse_window_bound("run_datetime_end", run_datetime_end),
+        )
+        self.interval_window = (
+            self._parse_window_bound(
+                "interval_datetime_start", interval_datetime_start
+            ),
+            self._parse_window_bound("interval_datetime_end", interval_datetime_end),
+        )
+        self.filename_datetime_template = filename_datetime_template
+        # whether the file name timestamp is the run time or the valid time
+        self.filename_datetime_kind = filename_datetime_kind or "run"
+        if self.filename_datetime_kind not in ("run", "interval"):
+            raise ValueError(
+                f"Invalid filename_datetime_kind '{filename_datetime_kind}': "
+                "expected 'run' or 'interval'"
+            )
+
+        # emit each field only from the newest run found across files
+        self.latest_run_only = bool(latest_run_only)
+
+        # emit only points that changed since the last emission of the field
+        self.change_store = change_store
+        self.change_abs_tolerance = float(change_abs_tolerance or 0.0)
+        self.change_rel_tolerance = float(change_rel_tolerance or 0.0)
+
+        # decode messages of a single file in parallel worker processes
+        self.decode_workers = max(int(decode_workers or 1), 1)
+
+        # temporal aggregation: one row per point and time bucket
+        self.aggregate_period = aggregate_period or None
+        self.aggregate_timezone = aggregate_timezone or "UTC"
+        self.aggregate_functions = list(aggregate_functions or ("min", "mean", "max"))
+        self.aggregate_store_path = aggregate_store_path
+        self.aggregate_flush = bool(aggregate_flush)
+        if self.aggregate_period:
+            parse_period(self.aggregate_period)
+            try:
+                ZoneInfo(self.aggregate_timezone)
+            except (ZoneInfoNotFoundError, ValueError) as e:
+                raise ValueError(
+                    f"Invalid aggregate_timezone '{self.aggregate_timezone}': {e}"
+                ) from e
+            invalid_functions = set(self.aggregate_functions) - set(AGGREGATE_FUNCTIONS)
+            if invalid_functions:
+                raise ValueError(
+                    "Invalid aggregate_functions: "
+                    + ", ".join(sorted(invalid_functions))
+                )
+            if self.change_store is not None:
+                raise ValueError(
+                    "Invalid emit_changes_only: not supported with aggregate_period"
+                )
+
+        # remap every message onto a coarser regular lat/lon grid
+        self.regridder = (
+            Regridder(target_resolution, regrid_method, logger=self.logger)
+            if target_resolution
+            else None
+        )
+
+        # split sub-stream: reads only its key's messages from the shared splitter
+        self.splitter = splitter
+        self.split_key = split_key
+        # sync in progress while the files stream feeds it file by file
+        self._run: _SyncRun | None = None
+
         ignore_fields = ignore_fields or set()
         invalid = ignore_fields & self.CORE_FIELDS
         if invalid:
@@ -252,9 +966,22 @@ class GribStream(Stream):
         self.ignore_fields = ignore_fields
 
         self.state_partitioning_keys = [SDC_FILENAME]
+        if splitter is not None:
+            # one bookmark per sub-stream, not one per file context
+            self.state_partitioning_keys = []
         self.replication_key = SDC_INCREMENTAL_KEY
         self.forced_replication_method = "INCREMENTAL"
 
+    @staticmethod
+    def _parse_window_bound(setting: str, value: str | None) -> datetime | None:
+        if not value:
+            return None
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError as e:
+            raise ValueError(f"Invalid {setting} '{value}': {e}") from e
+        return _normalize_dt(dt)
+
     @property
     def is_sorted(self) -> bool:
         return False
@@ -298,160 +1025,867 @@ class GribStream(Stream):
             ),
         ]
 
+        if self.aggregate_period:
+            # statistics per time bucket replace the per-message value
+            index = [p.name for p in props].index("value")
+            props[index : index + 1] = [
+                *(
+                    th.Property(f"value_{fn}", th.NumberType(nullable=True))
+                    for fn in self.aggregate_functions
+                ),
+                th.Property("sample_count", th.IntegerType()),
+            ]
+            props = [p for p in props if p.name not in MESSAGE_FIELDS]
+
         props = [p for p in props if p.name not in self.ignore_fields]
         return th.PropertiesList(*props).to_dict()
 
     # --------------------------
     # Record extraction
     # --------------------------
-    def get_records(self, context: t.Mapping[str, t.Any] | None):
-        for path in self.extra_files:
-            self.logger.info(f"[{self.name}] Streaming records from {path}")
-            storage = Storage(path)
-            info = storage.describe(path)
-            mtime = info.mtime
-            filename = info.path
-
-            last_bookmark = self.get_starting_replication_key_value(context)
-            bookmark_dt = parse_bookmark(last_bookmark)
-
-            self.logger.debug(
-                "Partition context: %s, last_bookmark=%s, mtime=%s",
-                context,
-                bookmark_dt,
-                mtime,
+    def _file_in_window(self, path: str) -> bool:
+        """
+        Check the timestamp in the file name against the window it encodes
+        (run window by default, interval window for valid-time file names).
+        Files not matching the template are kept.
+        """
+        if not self.filename_datetime_template:
+            return True
+        if self.filename_datetime_kind == "interval":
+            start, end = self.interval_window
+        else:
+            start, end = self.run_window
+        if start is None and end is None:
+            return True
+
+        span = filename_datetime_span(path, self.filename_datetime_template)
+        if span is None:
+            return True
+        span_start, span_end = span
+        if (end is None or span_start < end) and (start is None or span_end > start):
+            return True
+
+        self.logger.info("Skipping %s (file name outside time window)", path)
+        return False
+
+    def _iter_file_infos(self) -> t.Iterator[FileInfo]:
+        """Yield metadata of the files to read, listing the pattern if needed."""
+        if self.file_infos is not None:
+            for info in self.file_infos:
+                if self._file_in_window(info.path):
+                    yield info
+            return
+
+        if self.extra_files:
+            for path in self.extra_files:
+                # prune before describe() to avoid a remote call per skipped file
+                if self._file_in_window(path):
+                    yield Storage(path).describe(path)
+            return
+
+        if not self.file_pattern:
+            return
+
+        files = (
+            self.listing_cache.get(self.file_pattern) if self.listing_cache else None
+        )
+        if files is None:
+            files = Storage(self.file_pattern).glob_info()
+            if self.listing_cache:
+                self.listing_cache.put(self.file_pattern, files)
+        if not files:
+            self.logger.warning(f"No files found for pattern: {self.file_pattern}")
+
+        for info in files:
+            if self._file_in_window(info.path):
+                yield info
+
+    @contextmanager
+    def _open_local(
+        self, info: FileInfo, wanted: set[str] | None = None
+    ) -> t.Iterator[str | None]:
+        """
+        Local GRIB path holding the messages of a file for this stream: a copy
+        of the file, or for split sub-streams the file's part for the split key
+        (None if the file has no such messages). ``wanted`` lists the sibling
+        split keys to extract too, if the file must be split (None: all).
+        """
+        if self.splitter is None or self.split_key is None:
+            with local_copy(
+                Storage(info.path), info.path, self.logger, self.name
+            ) as path:
+                yield path
+            return
+        yield self.splitter.part(info, self.split_key, wanted)
+
+    def _iter_file_headers(
+        self, info: FileInfo
+    ) -> t.Iterator[tuple[t.Any, tuple[int, int] | None]]:
+        """
+        (message, (offset, length)) of the messages of a file for this stream,
+        for header-only passes. Uncompressed files are read by range, yielding
+        header-only messages (no values); others are copied (or split) locally
+        and yield full messages with no byte span.
+        """
+        # deferred: pygrib (and pyproj) are only needed once data is read
+        import pygrib
+
+        splitter = self.splitter if self.split_key is not None else None
+        storage = Storage(info.path)
+        yielded = 0
+        if compression_from_name(info.path) is None:
+            try:
+                size = (
+                    info.size if info.size is not None else storage.fs.size(info.path)
+                )
+                for offset, length, head in iter_message_heads(
+                    storage, info.path, size
+                ):
+                    msg = pygrib.fromstring(head)
+                    if splitter is not None and splitter.key(msg) != self.split_key:
+                        continue
+                    yielded += 1
+                    yield msg, (offset, length)
+                return
+            except ValueError as e:
+                self.logger.info(
+                    "[%s] %s: headers not readable by range (%s), copying the file",
+                    self.name,
+                    info.path,
+                    e,
+                )
+
+        with self._open_local(info, self._split_wanted(info)) as tmp_path:
+            if tmp_path is None:
+                return
+            with pygrib.open(tmp_path) as grbs:  # type: ignore[attr-defined]
+                for index, msg in enumerate(grbs):
+                    # messages already yielded before the ranged read failed
+                    if index >= yielded:
+                        yield msg, None
+
+    def _split_wanted(self, info: FileInfo) -> set[str]:
+        """Split keys of selected sibling sub-streams that still need a file."""
+        if self.splitter is None:
+            return set()
+        wanted: set[str] = set()
+        for key, stream in self.splitter.streams.items():
+            if not stream.selected:
+                continue
+            bookmark = parse_bookmark(stream.get_starting_replication_key_value(None))
+            if bookmark is None or info.mtime > bookmark:
+                wanted.add(key)
+        return wanted
+
+    def _skip_past_cutoff(self) -> datetime | None:
+        if not self.skip_past:
+            return None
+        return self.skip_past_reference or datetime.now(timezone.utc)
+
+    def _read_header(
+        self, msg: t.Any, cutoff: datetime | None
+    ) -> dict[str, t.Any] | None:
+        """
+        Record fields taken from the message header only (no grid decoding).
+        None if the message has no usable time or is filtered out.
+        """
+        # Compute run time + interval semantics
+        run_dt = _compute_run_datetime(msg)
+        if run_dt is None:
+            return None
+
+        step_range, step_units, interval_start_dt, interval_end_dt = (
+            _compute_interval_semantics(msg, run_dt)
+        )
+        if interval_start_dt is None or interval_end_dt is None:
+            return None
+
+        if not _in_window(run_dt, *self.run_window):
+            return None
+        if not _in_window(interval_start_dt, *self.interval_window):
+            return None
+
+        # Past-date filtering: keep original intent:
+        # filter ONLY instantaneous messages that are in the past.
+        if cutoff is not None:
+            pdt = safe_get(msg, "productDefinitionTemplateNumber")
+            is_instantaneous = (pdt in INSTANTANEOUS_PDTS) if pdt is not None else False
+            if is_instantaneous and interval_end_dt < cutoff:
+                return None
+
+        return {
+            "run_datetime": run_dt,
+            "interval_start_datetime": interval_start_dt,
+            "interval_end_datetime": interval_end_dt,
+            "step_range": step_range,
+            "step_units": step_units,
+            "forecast_step_hours": _compute_forecast_step_hours(msg),
+            "level_type": safe_get(msg, "typeOfLevel", None),
+            "level": safe_get(msg, "level", None),
+            "name": safe_get(msg, "shortName", None),
+            "ensemble": safe_get(msg, "perturbationNumber", None),
+            "edition": safe_get(msg, "edition", None),
+            "centre": safe_get(msg, "centre", None),
+            "data_type": safe_get(msg, "dataType", None),
+            "grid_type": safe_get(msg, "gridType", None),
+        }
+
+    def _grid_records(
+        self,
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        grid_id: str | None,
+        header: dict[str, t.Any],
+        base_record: dict[str, t.Any],
+        source: str | None = None,
+    ) -> t.Iterator[dict[str, t.Any]]:
+        """
+        Yield one record per kept point of a decoded message grid. The change
+        store is keyed by the full header, before ignore_fields are dropped,
+        and remembers ``source`` (the file, as path|mtime) for replays.
+        """
+        lats, lons, vals, regular = grid
+
+        # change-only mode: drop points equal (within tolerance) to the last emission
+        changed: np.ndarray | None = None
+        change_key: str | None = None
+        if self.change_store is not None and grid_id is not None:
+            change_key = f"{_field_key(header)}|{grid_id}"
+            changed = self.change_store.changed(
+                change_key,
+                vals,
+                abs_tolerance=self.change_abs_tolerance,
+                rel_tolerance=self.change_rel_tolerance,
+                source=source,
             )
 
-            # Skip whole file if already processed
-            if bookmark_dt and mtime <= bookmark_dt:
+        offset = 0
+        chunks = _iter_grid_chunks(lats, lons, vals, regular, self.max_points_per_chunk)
+        for block_lats, block_lons, block_vals in chunks:
+            keep = ~np.ma.getmaskarray(block_vals)
+            if changed is not None:
+                keep &= changed[offset : offset + block_vals.size]
+            offset += block_vals.size
+            if self.bboxes:
+                keep &= _bbox_mask(block_lats, block_lons, self.bboxes)
+
+            for lat, lon, val in zip(
+                block_lats[keep], block_lons[keep], np.ma.getdata(block_vals)[keep]
+            ):
+                rec = dict(base_record)
+                rec["lat"] = float(lat)
+                rec["lon"] = float(lon)
+                rec["value"] = float(val)
+
+                # Drop ignored fields at record-level too (safety)
+                for f in self.ignore_fields:
+                    rec.pop(f, None)
+
+                yield rec
+
+        if self.change_store is not None and change_key is not None:
+            # the values emitted: sub-tolerance drift keeps accumulating
+            self.change_store.put(change_key, vals, changed, source)
+
+    def _iter_decoded_messages(
+        self, local_path: str, latest: _LatestRuns | None
+    ) -> t.Iterator[tuple[dict[str, t.Any], tuple, str | None, int]]:
+        """
+        Yield (header, decoded grid, grid id, message number) for the kept
+        messages of a local file, in file order. With ``decode_workers`` > 1 the
+        grids are decoded by worker processes reading messages by byte offset.
+        """
+        # deferred: pygrib (and pyproj) are only needed once data is read
+        import pygrib
+
+        # Cutoff once per file
+        cutoff = self._skip_past_cutoff()
+        need_grid_id = (
+            self.change_store is not None
+            or self.regridder is not None
+            or bool(self.aggregate_period)
+        )
+
+        offsets = None
+        if self.decode_workers > 1:
+            offsets = _scan_message_offsets(local_path)
+
+        with pygrib.open(local_path) as grbs:  # type: ignore[attr-defined]
+            if offsets is not None and len(offsets) != grbs.messages:
                 self.logger.info(
-                    "Skipping %s (mtime=%s <= bookmark=%s)",
-                    filename,
-                    mtime,
-                    bookmark_dt,
+                    "%s: message layout not indexable, decoding serially", local_path
+                )
+                offsets = None
+
+            kept = self._iter_kept_messages(grbs, cutoff, latest, need_grid_id)
+            if offsets is None:
+                for _, msg, header, grid_id, number in kept:
+                    try:
+                        grid = _decode_grid(msg, self.value_dtype)
+                    except Exception as e:
+                        self.logger.warning(f"Skipping message: {e}")
+                        continue
+                    yield header, grid, grid_id, number
+                return
+
+            # workers decode by byte offset while the headers are still read
+            calls = (
+                (
+                    (header, grid_id, number),
+                    (local_path, *offsets[index], self.value_dtype),
                 )
+                for index, _, header, grid_id, number in kept
+            )
+            with ProcessPoolExecutor(max_workers=self.decode_workers) as pool:
+                results = _ordered_results(
+                    pool, _decode_message_at, calls, window=2 * self.decode_workers
+                )
+                for (header, grid_id, number), result in results:
+                    try:
+                        grid = result.result()
+                    except Exception as e:
+                        self.logger.warning(f"Skipping message: {e}")
+                        continue
+                    yield header, grid, grid_id, number
+
+    def _iter_kept_messages(
+        self,
+        grbs: t.Any,
+        cutoff: datetime | None,
+        latest: _LatestRuns | None,
+        need_grid_id: bool,
+    ) -> t.Iterator[tuple[int, t.Any, dict[str, t.Any], str | None, int]]:
+        """
+        Yield (index, message, header, grid id, message number) for the
+        messages of an open file passing the header filters, without decoding.
+        """
+        for index, msg in enumerate(grbs):
+            header = self._read_header(msg, cutoff)
+            if header is None:
+                continue
+            if latest is not None and not latest.is_winner(header):
                 continue
 
-            # open GRIB file (works for remote by copying to tmp first)
-            tmp_path: str | None = None
-            with storage.open(path, "rb") as src:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".grib") as tmp:
-                    shutil.copyfileobj(src, tmp)
-                    tmp_path = tmp.name
+            grid_id = _grid_id(msg) if need_grid_id else None
+            yield index, msg, header, grid_id, safe_get(msg, "messagenumber", index + 1)
 
-            try:
+    def get_records(self, context: t.Mapping[str, t.Any] | None):
+        if context is None or "path" not in context:
+            run = self._start_run(context)
+            for info in run.files:
+                yield from self._file_records(info, run, context)
+            yield from self._finish_run(run)
+            if self.splitter is not None and self.split_key is not None:
+                self.splitter.release(self.split_key)
+            return
+
+        # split sub-stream: its files stream syncs it once per file
+        if self._run is None:
+            self._run = self._start_run(context)
+        run = self._run
+        for info in run.files:
+            if info.path == context["path"]:
+                yield from self._file_records(info, run, context)
+        if context.get("last"):
+            self._run = None
+            yield from self._finish_run(run)
+
+    def _start_run(self, context: t.Mapping[str, t.Any] | None) -> "_SyncRun":
+        """Bookmark, files, latest runs inventory and aggregator of a sync."""
+        last_bookmark = self.get_starting_replication_key_value(context)
+        bookmark_dt = parse_bookmark(last_bookmark)
+
+        files: list[FileInfo] = list(self._iter_file_infos())
+        latest: _LatestRuns | None = None
+        if self.latest_run_only:
+            files = [
+                info
+                for info in files
+                if not (bookmark_dt and info.mtime <= bookmark_dt)
+            ]
+            latest = _LatestRuns(self.get_context_state(context))
+            self._build_inventory(files, latest)
+
+        aggregator: TemporalAggregator | None = None
+        if self.aggregate_period:
+            aggregator = TemporalAggregator(
+                self.get_context_state(context),
+                self.aggregate_store_path
+                or os.path.join(
+                    tempfile.gettempdir(), "tap-grib-aggregates", self.name
+                ),
+                self.aggregate_period,
+                tz=self.aggregate_timezone,
+                functions=self.aggregate_functions,
+                logger=self.logger,
+            )
+        return _SyncRun(bookmark_dt, files, latest, aggregator)
+
+    def _file_records(
+        self,
+        info: FileInfo,
+        run: "_SyncRun",
+        context: t.Mapping[str, t.Any] | None,
+    ) -> t.Iterator[dict[str, t.Any]]:
+        bookmark_dt, latest, aggregator = run.bookmark_dt, run.latest, run.aggregator
+        path = info.path
+        self.logger.info(f"[{self.name}] Streaming records from {path}")
+        mtime = info.mtime
+        filename = info.path
+
+        self.logger.debug(
+            "Partition context: %s, last_bookmark=%s, mtime=%s",
+            context,
+            bookmark_dt,
+            mtime,
+        )
+
+        # Skip whole file if already processed
+        if bookmark_dt and mtime <= bookmark_dt:
+            self.logger.info(
+                "Skipping %s (mtime=%s <= bookmark=%s)",
+                filename,
+                mtime,
+                bookmark_dt,
+            )
+            return
+
+        if latest is not None and not latest.has_winners(filename):
+            self.logger.info("Skipping %s (only superseded runs)", filename)
+        else:
+            # open GRIB file (works for remote by copying to tmp first)
+            with self._open_local(info, self._split_wanted(info)) as tmp_path:
                 if tmp_path is None:
-                    raise Exception("temporary file path (tmp_path) is not available")
-
-                with pygrib.open(tmp_path) as grbs:  # type: ignore[attr-defined]
-
-                    # Cutoff once per file
-                    cutoff: datetime | None = None
-                    if self.skip_past:
-                        cutoff = self.skip_past_reference or datetime.now(timezone.utc)
-
-                    for msg in grbs:
-                        try:
-                            lats, lons, vals = _extract_grid(msg)
-                        except Exception as e:
-                            self.logger.warning(f"Skipping message: {e}")
-                            continue
-                        if lats.size == 0:
-                            continue
-
-                        # Compute run time + interval semantics
-                        run_dt = _compute_run_datetime(msg)
-                        if run_dt is None:
-                            continue
-
-                        step_range, step_units, interval_start_dt, interval_end_dt = (
-                            _compute_interval_semantics(msg, run_dt)
-                        )
-                        if interval_start_dt is None or interval_end_dt is None:
-                            continue
-
-                        # Past-date filtering: keep original intent:
-                        # filter ONLY instantaneous messages that are in the past.
-                        if cutoff is not None:
-                            pdt = safe_get(msg, "productDefinitionTemplateNumber")
-                            is_instantaneous = (
-                                (pdt in INSTANTANEOUS_PDTS)
-                                if pdt is not None
-                                else False
-                            )
-                            if is_instantaneous and interval_end_dt < cutoff:
-                                continue
-
-                        forecast_step_hours = _compute_forecast_step_hours(msg)
-
-                        base_record = {
-                            "run_datetime": run_dt,
-                            "interval_start_datetime": interval_start_dt,
-                            "interval_end_datetime": interval_end_dt,
-                            "step_range": step_range,
-                            "step_units": step_units,
-                            "forecast_step_hours": forecast_step_hours,
-                            "level_type": safe_get(msg, "typeOfLevel", None),
-                            "level": safe_get(msg, "level", None),
-                            "name": safe_get(msg, "shortName", None),
-                            "ensemble": safe_get(msg, "perturbationNumber", None),
-                            "edition": safe_get(msg, "edition", None),
-                            "centre": safe_get(msg, "centre", None),
-                            "data_type": safe_get(msg, "dataType", None),
-                            "grid_type": safe_get(msg, "gridType", None),
-                            SDC_INCREMENTAL_KEY: to_iso8601(mtime),
-                            SDC_FILENAME: filename,
-                        }
-
-                        # Drop ignored fields at base_record-level too
-                        for f in self.ignore_fields:
-                            base_record.pop(f, None)
-
-                        for lat, lon, val in zip(lats, lons, vals):
-                            if val is None or (hasattr(val, "mask") and val.mask):
-                                continue
-
-                            if self.bboxes:
-                                valid_bbox = False
-                                for bbox in self.bboxes:
-                                    min_lon, min_lat, max_lon, max_lat = bbox
-                                    if (min_lon <= lon <= max_lon) and (
-                                        min_lat <= lat <= max_lat
-                                    ):
-                                        valid_bbox = True
-                                        break
-                                if not valid_bbox:
-                                    continue
-
-                            rec = dict(base_record)
-                            rec["lat"] = float(lat)
-                            rec["lon"] = float(lon)
-                            rec["value"] = float(val)
-
-                            # Drop ignored fields at record-level too (safety)
-                            for f in self.ignore_fields:
-                                rec.pop(f, None)
-
-                            yield rec
-
-                    # advance bookmark with the latest seen mtime
-                    self._increment_stream_state(
-                        {SDC_INCREMENTAL_KEY: to_iso8601(mtime)},
-                        context=context,
+                    self.logger.info(
+                        "Skipping %s (no %s messages)", filename, self.split_key
                     )
+                else:
+                    try:
+                        decoded = self._iter_decoded_messages(tmp_path, latest)
+                        # decoding happens while fetching the next message
+                        _reset_peak_rss()
+                        for header, grid, grid_id, number in decoded:
+                            yield from self._message_records(
+                                header, grid, grid_id, info, aggregator, latest
+                            )
+                            self._log_peak_rss(filename, number)
+
+                        if aggregator is not None:
+                            for bucket in aggregator.pop_closed():
+                                yield from self._bucket_records(
+                                    bucket, aggregator.functions
+                                )
+                            aggregator.save()
+
+                        # advance bookmark with the latest seen mtime
+                        self._increment_stream_state(
+                            {SDC_INCREMENTAL_KEY: to_iso8601(mtime)},
+                            context=context,
+                        )
+
+                    except Exception as e:
+                        self.logger.error(f"Failed to process grib {path}: {e}")
+
+        # ensure state advanced even if errors happened
+        self._increment_stream_state(
+            {SDC_INCREMENTAL_KEY: to_iso8601(mtime)},
+            context=context,
+        )
 
+    def _finish_run(self, run: "_SyncRun") -> t.Iterator[dict[str, t.Any]]:
+        aggregator = run.aggregator
+        # finite backfill: no message past the window end will close the last buckets
+        until = self.interval_window[1]
+        if self.aggregate_flush:
+            until = datetime.max.replace(tzinfo=timezone.utc)
+        if aggregator is not None and until is not None:
+            for bucket in aggregator.pop_closed(until):
+                yield from self._bucket_records(bucket, aggregator.functions)
+            aggregator.save()
+
+        if run.latest is not None:
+            run.latest.prune()
+
+    def _message_records(
+        self,
+        header: dict[str, t.Any],
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        grid_id: str | None,
+        info: FileInfo,
+        aggregator: TemporalAggregator | None,
+        latest: _LatestRuns | None,
+    ) -> t.Iterator[dict[str, t.Any]]:
+        """
+        Yield the records of a decoded message (none when aggregating: the
+        message is folded into its time bucket instead).
+        """
+        if self.regridder is not None:
+            try:
+                grid = self.regridder(grid, str(grid_id))
             except Exception as e:
-                self.logger.error(f"Failed to process grib {self.file_path}: {e}")
-
-            finally:
-                try:
-                    if tmp_path:
-                        os.remove(tmp_path)
-                except Exception:
-                    pass
-
-            # ensure state advanced even if errors happened
-            self._increment_stream_state(
-                {SDC_INCREMENTAL_KEY: to_iso8601(mtime)},
-                context=context,
+                self.logger.warning(f"Skipping message: {e}")
+                return
+
+        if aggregator is not None:
+            self._aggregate(aggregator, header, grid, grid_id, info)
+            if latest is not None:
+                latest.mark_emitted(header)
+            return
+
+        base_record = {
+            **header,
+            SDC_INCREMENTAL_KEY: to_iso8601(info.mtime),
+            SDC_FILENAME: info.path,
+        }
+
+        # Drop ignored fields at base_record-level too
+        for f in self.ignore_fields:
+            base_record.pop(f, None)
+
+        try:
+            yield from self._grid_records(
+                grid,
+                grid_id,
+                header,
+                base_record,
+                f"{info.path}|{to_iso8601(info.mtime)}",
+            )
+        except Exception as e:
+            self.logger.warning(f"Skipping message: {e}")
+            return
+
+        if latest is not None:
+            latest.mark_emitted(header)
+
+    def _log_peak_rss(self, filename: str, number: int) -> None:
+        """Log the peak RSS since the previous message (decode included)."""
+        peak = _peak_rss_bytes()
+        if peak is not None:
+            self.logger.info(
+                "[%s] %s message %s: peak RSS %.1f MiB",
+                self.name,
+                filename,
+                number,
+                peak / 2**20,
+            )
+        _reset_peak_rss()
+
+    def _aggregate(
+        self,
+        aggregator: TemporalAggregator,
+        header: dict[str, t.Any],
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        grid_id: str | None,
+        info: FileInfo,
+    ) -> None:
+        """Fold a decoded message into its time bucket."""
+        field = self._aggregate_field(header, grid_id)
+        if not aggregator.add(field, header, grid, info.path, info.mtime):
+            self.logger.warning(
+                "Skipping late %s message at %s (bucket already emitted)",
+                header.get("name"),
+                header["interval_start_datetime"],
+            )
+
+    @staticmethod
+    def _aggregate_field(header: dict[str, t.Any], grid_id: str | None) -> str:
+        """Aggregated field of a message: variable, level, member and grid."""
+        field = "|".join(
+            str(header.get(k)) for k in ("name", "level_type", "level", "ensemble")
+        )
+        return f"{field}|{grid_id}"
+
+    def _bucket_records(
+        self, bucket: Bucket, functions: list[str]
+    ) -> t.Iterator[dict[str, t.Any]]:
+        """Yield one record per sampled point of a closed time bucket."""
+        base_record = {
+            **bucket.record(),
+            SDC_INCREMENTAL_KEY: to_iso8601(bucket.mtime) if bucket.mtime else None,
+            SDC_FILENAME: bucket.filename,
+        }
+        for f in self.ignore_fields:
+            base_record.pop(f, None)
+        statistics = bucket.statistics(functions)
+
+        # chunk over point indices, so every statistic is gathered per block
+        index = np.ma.masked_array(np.arange(bucket.count.size), mask=bucket.count == 0)
+        chunks = _iter_grid_chunks(
+            bucket.lats, bucket.lons, index, bucket.regular, self.max_points_per_chunk
+        )
+        for block_lats, block_lons, block_index in chunks:
+            keep = ~np.ma.getmaskarray(block_index)
+            if self.bboxes:
+                keep &= _bbox_mask(block_lats, block_lons, self.bboxes)
+
+            for lat, lon, i in zip(
+                block_lats[keep], block_lons[keep], np.ma.getdata(block_index)[keep]
+            ):
+                rec = dict(base_record)
+                rec["lat"] = float(lat)
+                rec["lon"] = float(lon)
+                for fn, values in statistics.items():
+                    value = float(values[i])
+                    rec[f"value_{fn}"] = None if np.isnan(value) else value
+                rec["sample_count"] = int(bucket.count[i])
+                yield rec
+
+    def _record_bytes(self, header: dict[str, t.Any], info: FileInfo) -> int:
+        """Approximate size of one serialized RECORD message for a message header."""
+        dropped = set(self.ignore_fields)
+        values: dict[str, t.Any] = {"value": 273.123456}
+        if self.aggregate_period:
+            dropped.update(MESSAGE_FIELDS)
+            values = {f"value_{fn}": 273.123456 for fn in self.aggregate_functions}
+            values["sample_count"] = 24
+        record = {
+            **{
+                k: (
+                    v.isoformat(timespec="microseconds")
+                    if isinstance(v, datetime)
+                    else v
+                )
+                for k, v in header.items()
+                if k not in dropped
+            },
+            SDC_INCREMENTAL_KEY: to_iso8601(info.mtime),
+            SDC_FILENAME: info.path,
+            "lat": 45.123456,
+            "lon": 11.123456,
+            **values,
+        }
+        message = {"type": "RECORD", "stream": self.name, "record": record}
+        # + time_extracted and the line break
+        return len(json.dumps(message, separators=(",", ":"))) + 60
+
+    def _benchmark_rows_per_second(self, msg: t.Any, header: dict[str, t.Any]) -> float:
+        """
+        Decode one message and serialize its records to measure throughput
+        (without grid id, so the change store is left untouched).
+        """
+        started = time.perf_counter()
+        grid = _decode_grid(msg, self.value_dtype)
+        rows = 0
+        base_record = {**header, SDC_FILENAME: None}
+        for rec in self._grid_records(grid, None, header, base_record):
+            json.dumps(rec, default=str)
+            rows += 1
+        elapsed = time.perf_counter() - started
+        return rows / elapsed if rows and elapsed > 0 else 0.0
+
+    def _benchmark_bytes_per_second(self, info: FileInfo) -> float:
+        """
+        Read (and decompress) the first bytes of a file to measure the
+        throughput of the copies a sync makes, in stored bytes per second.
+        """
+        try:
+            stats = Storage(info.path).sample_read(info.path, _TRANSFER_SAMPLE_BYTES)
+        except Exception as e:
+            self.logger.warning(f"Transfer benchmark of {info.path} failed: {e}")
+            return 0.0
+        if not stats.compressed_bytes or stats.seconds <= 0:
+            return 0.0
+        return stats.compressed_bytes / stats.seconds
+
+    def plan(
+        self,
+        rows_per_second: float | None = None,
+        bytes_per_second: float | None = None,
+    ) -> dict[str, t.Any]:
+        """
+        Estimate what a sync would emit without decoding any grid: per file,
+        messages and points passing the configured filters, output bytes and
+        runtime. Headers are read by range; files that must be copied for it
+        are flagged. Files at or before the stored bookmark are left out, as
+        in an incremental sync. Points are counted on the target grid when
+        regridding, and per time bucket (in the file first reaching it) when
+        aggregating. Unless given, decode throughput is benchmarked on the
+        first message and transfer (and decompression) throughput on the
+        first bytes of the first file; the runtime adds both.
+        """
+        # deferred: pygrib (and pyproj) are only needed once data is read
+        import pygrib
+
+        # the starting replication value is only set once a sync starts
+        state = self.get_context_state(None)
+        bookmark_dt = parse_bookmark(state.get("replication_key_value"))
+        latest = _LatestRuns(copy.deepcopy(state)) if self.latest_run_only else None
+
+        need_grid_id = self.regridder is not None or bool(self.aggregate_period)
+
+        scanned: list[tuple[FileInfo, list[_PlanMessage], bool]] = []
+        for info in self._iter_file_infos():
+            if bookmark_dt and info.mtime <= bookmark_dt:
+                continue
+            messages: list[_PlanMessage] = []
+            copied = False
+            cutoff = self._skip_past_cutoff()
+            for msg, span in self._iter_file_headers(info):
+                copied = copied or span is None
+                header = self._read_header(msg, cutoff)
+                if header is None:
+                    continue
+                grid_id = _grid_id(msg) if need_grid_id else None
+                points = self._plan_points(msg, grid_id)
+                if not rows_per_second and points:
+                    if span is not None:
+                        offset, length = span
+                        data = Storage(info.path).read_range(
+                            info.path, offset, offset + length
+                        )
+                        msg = pygrib.fromstring(data)
+                    rows_per_second = self._benchmark_rows_per_second(msg, header)
+                if latest is not None:
+                    latest.offer(info.path, header)
+                messages.append((header, points, grid_id))
+            scanned.append((info, messages, copied))
+
+        if latest is not None:
+            scanned = [
+                (info, [m for m in messages if latest.is_winner(m[0])], copied)
+                for info, messages, copied in scanned
+            ]
+        if not bytes_per_second and scanned:
+            bytes_per_second = self._benchmark_bytes_per_second(scanned[0][0])
+        if self.aggregate_period:
+            file_rows = self._plan_bucket_rows(
+                [messages for _, messages, _ in scanned],
+                state.get(TemporalAggregator.STATE_KEY, {}),
             )
+        else:
+            file_rows = [[(h, p) for h, p, _ in messages] for _, messages, _ in scanned]
+
+        files: list[dict[str, t.Any]] = []
+        for (info, messages, copied), rows in zip(scanned, file_rows):
+            points = sum(p for _, p in rows)
+            size = sum(p * self._record_bytes(h, info) for h, p in rows)
+            decode = points / rows_per_second if rows_per_second else None
+            transfer = (
+                info.size / bytes_per_second
+                if bytes_per_second and info.size is not None
+                else None
+            )
+            seconds = [s for s in (decode, transfer) if s is not None]
+            files.append(
+                {
+                    "path": info.path,
+                    "size": info.size,
+                    "copied": copied,
+                    "messages": len(messages),
+                    "points": points,
+                    "estimated_bytes": size,
+                    "estimated_decode_seconds": (
+                        round(decode, 3) if decode is not None else None
+                    ),
+                    "estimated_transfer_seconds": (
+                        round(transfer, 3) if transfer is not None else None
+                    ),
+                    "estimated_seconds": round(sum(seconds), 3) if seconds else None,
+                }
+            )
+
+        totals = {
+            key: sum(f[key] or 0 for f in files)
+            for key in (
+                "messages",
+                "points",
+                "estimated_bytes",
+                "estimated_decode_seconds",
+                "estimated_transfer_seconds",
+                "estimated_seconds",
+            )
+        }
+        report = {
+            "stream": self.name,
+            "bookmark": to_iso8601(bookmark_dt) if bookmark_dt else None,
+            "rows_per_second": round(rows_per_second, 1) if rows_per_second else None,
+            "bytes_per_second": (
+                round(bytes_per_second, 1) if bytes_per_second else None
+            ),
+            "files": files,
+            "totals": totals,
+        }
+        if self.splitter is not None and self.split_key is not None:
+            self.splitter.release(self.split_key)
+        return report
+
+    def _plan_points(self, msg: t.Any, grid_id: str | None) -> int:
+        """
+        Points a message would emit, on the target grid when regridding (an
+        upper bound there: a target cell is dropped only if all its sources
+        are missing, which is unknown without decoding).
+        """
+        if self.regridder is None or grid_id is None:
+            return _count_points(msg, self.bboxes)
+
+        try:
+            axes = _regular_ll_axes(msg)
+            if axes is not None:
+                grid = (axes[0], axes[1], np.empty(0), True)
+            else:
+                lats, lons = msg.latlons()
+                grid = (np.ravel(lats), np.ravel(lons), np.empty(0), False)
+            weights = self.regridder.cached_weights(grid, grid_id)
+        except Exception as e:
+            self.logger.warning(f"Skipping message: {e}")
+            return 0
+        if weights is None:
+            return _count_points(msg, self.bboxes)
+
+        cells = np.unique(weights.rows)
+        if not self.bboxes:
+            return int(cells.size)
+        lats = weights.lats[cells // weights.lons.size]
+        lons = weights.lons[cells % weights.lons.size]
+        return int(_bbox_mask(lats, lons, self.bboxes).sum())
+
+    def _plan_bucket_rows(
+        self, file_messages: list[list[_PlanMessage]], aggregates: dict[str, t.Any]
+    ) -> list[list[tuple[dict[str, t.Any], int]]]:
+        """
+        Per file, (header, points) of the time buckets it is the first to
+        reach, with the most points any message of the bucket has. Messages
+        of buckets already emitted according to the stored state are skipped.
+        """
+        hours = parse_period(str(self.aggregate_period))
+        tz = ZoneInfo(self.aggregate_timezone or "UTC")
+        closed_until = aggregates.get("closed_until", {})
+        rows: list[list[tuple[dict[str, t.Any], int]]] = [[] for _ in file_messages]
+        first: dict[tuple[str, datetime], tuple[int, int]] = {}
+        for index, messages in enumerate(file_messages):
+            for header, points, grid_id in messages:
+                field = self._aggregate_field(header, grid_id)
+                at: datetime = header["interval_start_datetime"]
+                closed = closed_until.get(field)
+                if closed is not None and at < datetime.fromisoformat(closed):
+                    continue
+                bucket = (field, bucket_bounds(at, hours, tz)[0])
+                if bucket not in first:
+                    first[bucket] = (index, len(rows[index]))
+                    rows[index].append((header, points))
+                    continue
+                file_index, row_index = first[bucket]
+                bucket_header, bucket_points = rows[file_index][row_index]
+                rows[file_index][row_index] = (
+                    bucket_header,
+                    max(bucket_points, points),
+                )
+        return rows
+
+    def _build_inventory(self, files: list[FileInfo], latest: _LatestRuns) -> None:
+        """Header-only pass over files to find the newest run of every field."""
+        for info in files:
+            try:
+                cutoff = self._skip_past_cutoff()
+                for msg, _ in self._iter_file_headers(info):
+                    header = self._read_header(msg, cutoff)
+                    if header is not None:
+                        latest.offer(info.path, header)
+            except Exception as e:
+                self.logger.error(f"Failed to scan grib {info.path}: {e}")
+
+        self.logger.info(
+            "[%s] Inventory: %d fields, %d superseding previously emitted runs",
+            self.name,
+            len(latest.winners),
+            latest.superseded,
+        )
@@ -0,0 +1,246 @@
+"""Remapping decoded grids to a coarser regular lat/lon grid (numpy only)."""
+
+from __future__ import annotations
+import typing as t
+import numpy as np
+
+REGRID_METHODS = ("nearest", "bilinear")
+
+
+class RemapWeights:
+    """
+    Sparse remap matrix in coordinate form, ``target[rows] += weights *
+    source[cols]`` (``cols`` None: one weight per source point, in order),
+    onto the regular grid spanned by the ``lats``/``lons`` axes.
+    """
+
+    def __init__(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray | None,
+        weights: np.ndarray | None = None,
+    ) -> None:
+        self.lats = lats
+        self.lons = lons
+        self.rows = rows
+        self.cols = cols
+        self.weights = weights if weights is not None else np.ones(rows.size)
+
+    @property
+    def size(self) -> int:
+        return self.lats.size * self.lons.size
+
+    def apply(self, vals: np.ndarray) -> np.ma.MaskedArray:
+        """
+        Remap source values. Weights are renormalized over the non-missing
+        source points; targets without any are masked.
+        """
+        valid = ~np.ma.getmaskarray(vals)
+        data = np.where(valid, np.ma.getdata(vals), 0.0)
+        if self.cols is not None:
+            valid = valid[self.cols]
+            data = data[self.cols]
+
+        weights = self.weights * valid
+        total = np.bincount(self.rows, weights=weights * data, minlength=self.size)
+        norm = np.bincount(self.rows, weights=weights, minlength=self.size)
+        out = np.divide(total, norm, out=np.zeros_like(total), where=norm > 0)
+        return np.ma.masked_array(out.astype(vals.dtype), mask=norm <= 0)
+
+
+def _cell_index(coords: np.ndarray, resolution: float) -> np.ndarray:
+    """Index of the target cell [k*r - r/2, k*r + r/2) holding each coordinate."""
+    return np.floor(coords / resolution + 0.5).astype(np.int64)
+
+
+def _lon_cells(lons: np.ndarray, resolution: float) -> np.ndarray:
+    """Longitude cell indices, wrapped when the grid spans the globe."""
+    cells = _cell_index(lons, resolution)
+    per_globe = int(round(360.0 / resolution))
+    if cells.size and cells.max() - cells.min() + 1 > per_globe:
+        cells = np.mod(cells, per_globe)
+    return cells
+
+
+def _axis_cells(
+    coords: np.ndarray, cells: np.ndarray, resolution: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Target axis (in the source direction) and each coordinate's index on it."""
+    values, inverse = np.unique(cells, return_inverse=True)
+    axis = np.round(values * resolution, 10)
+    if coords.size > 1 and coords[0] > coords[-1]:
+        return axis[::-1], values.size - 1 - inverse
+    return axis, inverse
+
+
+def block_mean_weights(
+    lat_axis: np.ndarray, lon_axis: np.ndarray, resolution: float
+) -> RemapWeights | None:
+    """
+    Mean of the source points falling in each target cell, for a regular
+    grid given by its axes. None if the grid is not coarser than the source.
+    """
+    steps = [np.abs(np.diff(a)).min() for a in (lat_axis, lon_axis) if a.size > 1]
+    if not steps or resolution <= min(steps) * (1 + 1e-9):
+        return None
+
+    lats, lat_pos = _axis_cells(lat_axis, _cell_index(lat_axis, resolution), resolution)
+    lons, lon_pos = _axis_cells(lon_axis, _lon_cells(lon_axis, resolution), resolution)
+    rows = np.add.outer(lat_pos * lons.size, lon_pos).ravel()
+    return RemapWeights(lats, lons, rows, None)
+
+
+def nearest_weights(
+    lats: np.ndarray, lons: np.ndarray, resolution: float
+) -> RemapWeights:
+    """
+    For each target cell holding source points, the source point nearest to
+    the cell centre (distances scaled by cos(latitude) along longitudes).
+    """
+    lat_cells = _cell_index(lats, resolution)
+    lon_cells = _lon_cells(lons, resolution)
+    lat_axis = np.arange(lat_cells.max(), lat_cells.min() - 1, -1) * resolution
+    lon_axis = np.arange(lon_cells.min(), lon_cells.max() + 1) * resolution
+    lat_axis, lon_axis = np.round(lat_axis, 10), np.round(lon_axis, 10)
+
+    rows = (lat_cells.max() - lat_cells) * lon_axis.size + (lon_cells - lon_cells.min())
+    dlat = lats - lat_cells * resolution
+    dlon = np.mod(lons - lon_cells * resolution + 180.0, 360.0) - 180.0
+    distance = dlat**2 + (dlon * np.cos(np.radians(lats))) ** 2
+
+    # first source point of every row once sorted by (row, distance)
+    order = np.lexsort((distance, rows))
+    sorted_rows = rows[order]
+    first = np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]
+    return RemapWeights(lat_axis, lon_axis, sorted_rows[first], order[first])
+
+
+def separable_axes(
+    lats: np.ndarray, lons: np.ndarray
+) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    (lat axis, lon axis) if the flattened coordinates form a lat x lon product
+    (e.g. regular Gaussian grids), None otherwise.
+    """
+    if lats.size < 4:
+        return None
+    ni = int(np.argmax(lats != lats[0])) or lats.size
+    if lats.size % ni:
+        return None
+    lat2 = lats.reshape(-1, ni)
+    lon2 = lons.reshape(-1, ni)
+    if not (np.allclose(lat2, lat2[:, :1]) and np.allclose(lon2, lon2[:1, :])):
+        return None
+    return lat2[:, 0], lon2[0]
+
+
+def _bracket(axis: np.ndarray, coords: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Lower neighbour index on ``axis`` and interpolation fraction per coordinate."""
+    ascending = axis if axis[0] <= axis[-1] else axis[::-1]
+    lower = np.searchsorted(ascending, coords, side="right") - 1
+    lower = np.clip(lower, 0, axis.size - 2)
+    fraction = (coords - ascending[lower]) / (ascending[lower + 1] - ascending[lower])
+    if ascending is not axis:
+        # back to positions on the (descending) source axis
+        lower, fraction = axis.size - 2 - lower, 1.0 - fraction
+    return lower, fraction
+
+
+def _target_axis(axis: np.ndarray, resolution: float) -> np.ndarray:
+    """Multiples of resolution within the extent of axis, in its direction."""
+    cells = np.arange(
+        np.ceil(axis.min() / resolution - 1e-9),
+        np.floor(axis.max() / resolution + 1e-9) + 1,
+    )
+    values = np.round(cells * resolution, 10)
+    return values[::-1] if axis[0] > axis[-1] else values
+
+
+def bilinear_weights(
+    lat_axis: np.ndarray, lon_axis: np.ndarray, resolution: float
+) -> RemapWeights:
+    """
+    Bilinear interpolation at target cell centres inside a separable source
+    grid, from the four surrounding source points.
+    """
+    lats = _target_axis(lat_axis, resolution)
+    lons = _target_axis(lon_axis, resolution)
+
+    j, fy = _bracket(lat_axis, lats)
+    i, fx = _bracket(lon_axis, lons)
+    ni = lon_axis.size
+    target = np.arange(lats.size * lons.size)
+    j, fy = np.repeat(j, lons.size), np.repeat(fy, lons.size)
+    i, fx = np.tile(i, lats.size), np.tile(fx, lats.size)
+
+    rows = np.concatenate([target] * 4)
+    cols = np.concatenate(
+        [j * ni + i, j * ni + i + 1, (j + 1) * ni + i, (j + 1) * ni + i + 1]
+    )
+    weights = np.concatenate(
+        [(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx]
+    )
+    return RemapWeights(lats, lons, rows, cols, weights)
+
+
+class Regridder:
+    """
+    Remaps decoded grids onto a regular lat/lon grid of ``resolution``
+    degrees: block mean for regular lat/lon sources, ``method`` (nearest or
+    bilinear) for any other grid. Weights are built once per source geometry.
+    """
+
+    def __init__(
+        self, resolution: float, method: str | None = None, logger: t.Any = None
+    ) -> None:
+        if not resolution or resolution <= 0:
+            raise ValueError(f"Invalid target_resolution '{resolution}': must be > 0")
+        method = method or "nearest"
+        if method not in REGRID_METHODS:
+            raise ValueError(
+                f"Invalid regrid_method '{method}': "
+                f"expected one of {', '.join(REGRID_METHODS)}"
+            )
+        self.resolution = float(resolution)
+        self.method = method
+        self.logger = logger
+        self._weights: dict[str, RemapWeights | None] = {}
+
+    def weights(
+        self, grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool]
+    ) -> RemapWeights | None:
+        lats, lons, _, regular = grid
+        if regular:
+            return block_mean_weights(lats, lons, self.resolution)
+        if self.method == "bilinear":
+            axes = separable_axes(lats, lons)
+            if axes is not None and min(a.size for a in axes) > 1:
+                return bilinear_weights(*axes, self.resolution)
+            if self.logger:
+                self.logger.warning(
+                    "Grid has no separable lat/lon axes, remapping with nearest"
+                )
+        return nearest_weights(lats, lons, self.resolution)
+
+    def cached_weights(
+        self,
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        geometry: str,
+    ) -> RemapWeights | None:
+        """Weights for the source grid identified by geometry, built on first use."""
+        if geometry not in self._weights:
+            self._weights[geometry] = self.weights(grid)
+        return self._weights[geometry]
+
+    def __call__(
+        self,
+        grid: tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+        geometry: str,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+        """Remapped (lat axis, lon axis, vals, True); the grid itself if not coarser."""
+        weights = self.cached_weights(grid, geometry)
+        if weights is None:
+            return grid
+        return weights.lats, weights.lons, weights.apply(grid[2]), True
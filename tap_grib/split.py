@@ -0,0 +1,284 @@
+"""Splitting a path entry into one sub-stream per variable (and level type)."""
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+import typing as t
+from singer_sdk.streams import Stream
+from singer_sdk import typing as th
+from tap_grib.client import GribStream, iter_message_heads, local_copy, safe_get
+from tap_grib.storage import FileInfo, Storage, compression_from_name
+
+# split_by value -> GRIB keys forming the split key
+SPLIT_BY = {
+    "name": ("shortName",),
+    "name+level_type": ("shortName", "typeOfLevel"),
+}
+
+# record column -> GRIB key, for columns a sub-stream drops if never set
+OPTIONAL_FIELDS = {
+    "level_type": "typeOfLevel",
+    "level": "level",
+    "ensemble": "perturbationNumber",
+    "edition": "edition",
+    "centre": "centre",
+    "data_type": "dataType",
+    "grid_type": "gridType",
+}
+
+_FILES_SCHEMA = th.PropertiesList(
+    th.Property("path", th.StringType(), required=True),
+    th.Property("size", th.IntegerType()),
+    th.Property("mtime", th.DateTimeType()),
+).to_dict()
+
+
+class FileSplitter:
+    """
+    Splits each file once into local GRIB parts, one per split key, holding the
+    raw (still encoded) messages of that key; every sub-stream of a path entry
+    then reads its own part, so a file is fetched and scanned only once.
+
+    Sub-streams are fed file by file by a :class:`SplitFilesStream` parent, so
+    only the parts of the file being read are kept on local disk.
+
+    The keys found in each file are kept in ``index_path`` by split_by, path
+    and mtime, so discovery scans only new or modified files.
+    """
+
+    DEFAULT_INDEX_PATH = os.path.join(tempfile.gettempdir(), "tap-grib-split.json")
+
+    def __init__(
+        self, split_by: str, logger: t.Any, index_path: str | None = None
+    ) -> None:
+        if split_by not in SPLIT_BY:
+            raise ValueError(
+                f"Invalid split_by '{split_by}': expected one of {', '.join(SPLIT_BY)}"
+            )
+        self.split_by = split_by
+        self.logger = logger
+        self.index_path = index_path or self.DEFAULT_INDEX_PATH
+        # split key -> sub-stream, registered by the tap
+        self.streams: dict[str, GribStream] = {}
+
+        self._workdir = tempfile.TemporaryDirectory(prefix="tap-grib-split-")
+        # file path -> split key -> local part
+        self._parts: dict[str, dict[str, str]] = {}
+        # files split for every key, keys extracted by partial splits and
+        # keys whose parts were released, per file path
+        self._complete: set[str] = set()
+        self._covered: dict[str, set[str]] = {}
+        self._released: dict[str, set[str]] = {}
+
+    def key(self, msg: t.Any) -> str:
+        """Split key of a message, e.g. '2t' or '2t|surface'."""
+        return "|".join(str(safe_get(msg, k, None)) for k in SPLIT_BY[self.split_by])
+
+    @staticmethod
+    def _fields(msg: t.Any) -> set[str]:
+        """Optional columns a message sets."""
+        return {
+            field
+            for field, grib_key in OPTIONAL_FIELDS.items()
+            if safe_get(msg, grib_key, None) is not None
+        }
+
+    def _load_index(self) -> dict[str, t.Any]:
+        try:
+            with open(self.index_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save_index(self, data: dict[str, t.Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def discover(self, files: list[FileInfo]) -> dict[str, set[str]]:
+        """
+        Split keys found across files, each with the optional columns set by
+        at least one of its messages. Unindexed files are split on the way.
+        """
+        index = self._load_index()
+        indexed = index.setdefault(self.split_by, {})
+        found: dict[str, set[str]] = {}
+        for info in files:
+            entry = indexed.get(info.path)
+            if not entry or entry.get("mtime") != info.mtime.isoformat():
+                try:
+                    keys = self.scan(info)
+                except Exception as e:
+                    self.logger.error(f"Failed to scan grib {info.path}: {e}")
+                    continue
+                entry = {"mtime": info.mtime.isoformat(), "keys": keys}
+                indexed[info.path] = entry
+            for key, fields in entry["keys"].items():
+                found.setdefault(key, set()).update(fields)
+        self._save_index(index)
+        return found
+
+    def scan(self, info: FileInfo) -> dict[str, list[str]]:
+        """
+        Every key in a file with the optional columns it sets, from the
+        message headers (read by range unless the file is compressed).
+        """
+        # deferred: pygrib (and pyproj) are only needed once data is read
+        import pygrib
+
+        found: dict[str, set[str]] = {}
+        if compression_from_name(info.path) is None:
+            storage = Storage(info.path)
+            try:
+                size = (
+                    info.size if info.size is not None else storage.fs.size(info.path)
+                )
+                for _, _, head in iter_message_heads(storage, info.path, size):
+                    msg = pygrib.fromstring(head)
+                    found.setdefault(self.key(msg), set()).update(self._fields(msg))
+                return {key: sorted(fields) for key, fields in found.items()}
+            except ValueError as e:
+                self.logger.info(
+                    "%s: headers not readable by range (%s), copying the file",
+                    info.path,
+                    e,
+                )
+                found.clear()
+
+        with local_copy(Storage(info.path), info.path, self.logger, "split") as path:
+            with pygrib.open(path) as grbs:  # type: ignore[attr-defined]
+                for msg in grbs:
+                    found.setdefault(self.key(msg), set()).update(self._fields(msg))
+        return {key: sorted(fields) for key, fields in found.items()}
+
+    def split(self, info: FileInfo, keys: set[str] | None) -> dict[str, list[str]]:
+        """
+        Write the messages of a file into one part per key (all keys if None),
+        keeping parts already extracted. Returns every key in the file with the
+        optional columns it sets.
+        """
+        # deferred: pygrib (and pyproj) are only needed once data is read
+        import pygrib
+
+        parts = self._parts.setdefault(info.path, {})
+        found: dict[str, set[str]] = {}
+        outputs: dict[str, t.BinaryIO] = {}
+        try:
+            with local_copy(
+                Storage(info.path), info.path, self.logger, "split"
+            ) as path:
+                with pygrib.open(path) as grbs:  # type: ignore[attr-defined]
+                    for msg in grbs:
+                        key = self.key(msg)
+                        found.setdefault(key, set()).update(self._fields(msg))
+                        if keys is not None and key not in keys:
+                            continue
+                        if key not in outputs:
+                            if key in parts:
+                                continue
+                            fd, part = tempfile.mkstemp(
+                                dir=self._workdir.name, suffix=".grib"
+                            )
+                            outputs[key] = os.fdopen(fd, "wb")
+                            parts[key] = part
+                        outputs[key].write(msg.tostring())
+        finally:
+            for out in outputs.values():
+                out.close()
+
+        if keys is None:
+            self._complete.add(info.path)
+            self._released.pop(info.path, None)
+        else:
+            self._covered.setdefault(info.path, set()).update(keys)
+            self._released.get(info.path, set()).difference_update(keys)
+        self.logger.info(
+            "Split %s into %d parts (%s)", info.path, len(outputs), self.split_by
+        )
+        return {key: sorted(fields) for key, fields in found.items()}
+
+    def part(self, info: FileInfo, key: str, wanted: set[str] | None) -> str | None:
+        """
+        Local part of a file holding the messages of key (None if the file has
+        none). On first use the file is split for key and the ``wanted`` keys
+        of its siblings (all keys if None).
+        """
+        extracted = info.path in self._complete or key in self._covered.get(
+            info.path, set()
+        )
+        if not extracted or key in self._released.get(info.path, set()):
+            self.split(info, None if wanted is None else wanted | {key})
+        return self._parts.get(info.path, {}).get(key)
+
+    def _remove(self, path: str, key: str) -> None:
+        """Delete a part; its file is split again if the key is asked for."""
+        self._released.setdefault(path, set()).add(key)
+        part = self._parts.get(path, {}).pop(key, None)
+        if part is None:
+            return
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+
+    def drop(self, path: str) -> None:
+        """Delete the parts of a file, once every sub-stream has read it."""
+        for key in list(self._parts.get(path, {})):
+            self._remove(path, key)
+
+    def release(self, key: str) -> None:
+        """Delete the parts of key, once its sub-stream has read them."""
+        for path in self._parts:
+            self._remove(path, key)
+
+
+class SplitFilesStream(Stream):
+    """
+    The files of a split path entry, one record each. Its sub-streams are its
+    children: each file is synced into all of them before the next one, then
+    its parts are dropped. Unselected by default; it only drives the sync.
+    """
+
+    selected_by_default = False
+
+    def __init__(
+        self,
+        tap: t.Any,
+        name: str,
+        splitter: FileSplitter,
+        files: list[FileInfo],
+    ) -> None:
+        super().__init__(tap=tap, name=name, schema=_FILES_SCHEMA)
+        self.primary_keys = ["path"]
+        self.splitter = splitter
+        self.files = files
+
+    def get_records(
+        self, context: t.Mapping[str, t.Any] | None
+    ) -> t.Iterable[dict[str, t.Any]]:
+        for info in self.files:
+            # the sub-streams read the file before this generator resumes
+            yield {
+                "path": info.path,
+                "size": info.size,
+                "mtime": info.mtime.isoformat(),
+            }
+            self.splitter.drop(info.path)
+
+    def get_child_context(
+        self, record: dict[str, t.Any], context: t.Mapping[str, t.Any] | None
+    ) -> dict[str, t.Any]:
+        return {
+            "path": record["path"],
+            "last": record["path"] == self.files[-1].path,
+        }
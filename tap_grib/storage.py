@@ -1,7 +1,15 @@
 """Storage abstraction using fsspec."""
 
 from __future__ import annotations
+import bz2
+import gzip
+import io
+import json
 import os
+import queue
+import tempfile
+import threading
+import time
 import typing as t
 from fsspec.core import url_to_fs
 from urllib.parse import urlparse
@@ -18,6 +26,129 @@ class FileInfo:
     mtime: datetime
 
 
+@dataclass
+class CopyStats:
+    """Outcome of copying a (possibly compressed) file to a local file."""
+
+    compression: str | None
+    compressed_bytes: int
+    uncompressed_bytes: int
+    seconds: float
+
+
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+def compression_from_name(path: str) -> str | None:
+    """Compression codec implied by the file extension, if any."""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def compression_from_magic(head: bytes) -> str | None:
+    """Compression codec identified by the leading bytes of a file, if any."""
+    for magic, codec in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+class _PrefetchReader(io.RawIOBase):
+    """
+    Read ``raw`` in blocks from a background thread, so fetching the next
+    compressed block overlaps with decompressing the current one.
+    """
+
+    def __init__(self, raw: t.IO[bytes], block_size: int = 4 << 20, depth: int = 4):
+        self.bytes_read = 0
+        self._queue: queue.Queue[bytes | BaseException] = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(
+            target=self._fill, args=(raw, block_size), daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: bytes | BaseException) -> bool:
+        """Queue item unless the reader was closed meanwhile."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self, raw: t.IO[bytes], block_size: int) -> None:
+        try:
+            while not self._stop.is_set():
+                block = raw.read(block_size)
+                if not self._put(block) or not block:
+                    return
+        except BaseException as e:  # re-raised in the reading thread
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: t.Any) -> int:
+        while not self._buffer:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self.bytes_read += len(item)
+            self._buffer = memoryview(item)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self) -> None:
+        """Stop the reader thread and wait for it, before ``raw`` gets closed."""
+        self._stop.set()
+        self._thread.join()
+        super().close()
+
+
+def _decompressing_reader(src: t.IO[bytes], compression: str | None) -> t.IO[bytes]:
+    if compression is None:
+        return src
+    if compression == "gzip":
+        return t.cast(t.IO[bytes], gzip.GzipFile(fileobj=src, mode="rb"))
+    if compression == "bz2":
+        return t.cast(t.IO[bytes], bz2.BZ2File(src, mode="rb"))
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(
+                "Reading .zst files requires the 'zstandard' package "
+                "(pip install 'tap-grib[zstd]')"
+            ) from e
+        return t.cast(
+            t.IO[bytes],
+            zstandard.ZstdDecompressor().stream_reader(src, read_across_frames=True),
+        )
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
 class Storage:
     """Filesystem abstraction to list and open files using fsspec."""
 
@@ -49,6 +180,73 @@ class Storage:
         """Open a file handle with fsspec."""
         return self.fs.open(path, mode)
 
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """Bytes [start, end) of a file, fetched with a single ranged read."""
+        return self.fs.cat_file(path, start=start, end=end)
+
+    def copy_to(self, path: str, dst: t.IO[bytes]) -> CopyStats:
+        """
+        Copy a file into ``dst``, decompressing gzip/bz2/zstd on the fly.
+        Compression is detected by extension, else by magic bytes.
+        """
+        return self._read(path, dst)
+
+    def sample_read(self, path: str, limit: int) -> CopyStats:
+        """
+        Read (and decompress) about the first ``limit`` stored bytes of a file,
+        discarding them: a sample of the throughput of a copy.
+        """
+        return self._read(path, None, limit)
+
+    def _read(
+        self, path: str, dst: t.IO[bytes] | None, limit: int | None = None
+    ) -> CopyStats:
+        started = time.perf_counter()
+        with self.open(path, "rb") as raw:
+            compression = compression_from_name(path)
+            if compression is None:
+                compression = compression_from_magic(raw.read(4))
+                raw.seek(0)
+
+            prefetch = _PrefetchReader(raw)
+            try:
+                src = _decompressing_reader(
+                    t.cast(t.IO[bytes], io.BufferedReader(prefetch)), compression
+                )
+                uncompressed = 0
+                while True:
+                    block = src.read(1 << 20)
+                    if not block:
+                        break
+                    if dst is not None:
+                        dst.write(block)
+                    uncompressed += len(block)
+                    if limit is not None and prefetch.bytes_read >= limit:
+                        break
+            finally:
+                prefetch.close()
+
+        return CopyStats(
+            compression=compression,
+            compressed_bytes=prefetch.bytes_read,
+            uncompressed_bytes=uncompressed,
+            seconds=time.perf_counter() - started,
+        )
+
+    def glob_info(self) -> list[FileInfo]:
+        """Return metadata for matching files from a single listing call."""
+        details = self.fs.glob(self.path_glob, detail=True)
+        prefix = "s3://" if self.path_glob.startswith("s3://") else ""
+
+        files: list[FileInfo] = []
+        for path, info in details.items():
+            if info.get("type") == "directory":
+                continue
+            if prefix and not path.startswith(prefix):
+                path = f"{prefix}{path}"
+            files.append(self._to_file_info(path, info))
+        return files
+
     def describe(self, path: str) -> FileInfo:
         """Return normalized file metadata."""
         try:
@@ -57,6 +255,10 @@ class Storage:
             st = os.stat(path)
             info = {"name": path, "size": st.st_size, "mtime": st.st_mtime}
 
+        return self._to_file_info(path, info)
+
+    def _to_file_info(self, path: str, info: dict[str, t.Any]) -> FileInfo:
+        """Normalize an fsspec info dict."""
         mtime_val: t.Any = (
             info.get("mtime") or info.get("last_modified") or info.get("LastModified")
         )
@@ -92,3 +294,60 @@ class Storage:
         if path.startswith("file://"):
             return urlparse(path).path
         return os.path.abspath(path)
+
+
+class ListingCache:
+    """JSON file caching glob listings per pattern, valid for ``ttl`` seconds."""
+
+    DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "tap-grib-listing.json")
+
+    def __init__(self, path: str | None = None, ttl: float = 3600) -> None:
+        self.path = path or self.DEFAULT_PATH
+        self.ttl = ttl
+
+    def _load(self) -> dict[str, t.Any]:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, pattern: str) -> list[FileInfo] | None:
+        """Return the cached listing for pattern, None if missing or expired."""
+        entry = self._load().get(pattern)
+        if not entry or time.time() - entry.get("listed_at", 0) > self.ttl:
+            return None
+        try:
+            return [
+                FileInfo(
+                    path=f["path"],
+                    size=f.get("size"),
+                    mtime=datetime.fromisoformat(f["mtime"]),
+                )
+                for f in entry["files"]
+            ]
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def put(self, pattern: str, files: list[FileInfo]) -> None:
+        """Store the listing for pattern (atomic replace of the cache file)."""
+        data = self._load()
+        data[pattern] = {
+            "listed_at": time.time(),
+            "files": [
+                {"path": f.path, "size": f.size, "mtime": f.mtime.isoformat()}
+                for f in files
+            ],
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
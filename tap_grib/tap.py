@@ -1,14 +1,21 @@
 """Tap implementation for GRIB files (TapGrib)."""
 
 from __future__ import annotations
+import json
 import os
 import re
+import tempfile
 import typing as t
+import click
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th
 from singer_sdk.helpers.capabilities import TapCapabilities, CapabilitiesEnum
+from tap_grib.aggregate import AGGREGATE_FUNCTIONS
+from tap_grib.changes import ChangeStore
+from tap_grib.regrid import REGRID_METHODS
 from tap_grib.client import GribStream
-from tap_grib.storage import Storage
+from tap_grib.split import OPTIONAL_FIELDS, SPLIT_BY, FileSplitter, SplitFilesStream
+from tap_grib.storage import FileInfo, ListingCache, Storage, compression_from_name
 
 
 class TapGrib(Tap):
@@ -58,11 +65,227 @@ class TapGrib(Tap):
                         required=False,
                         description="Optional reference date for skip past",
                     ),
+                    th.Property(
+                        "max_points_per_chunk",
+                        th.IntegerType(),
+                        required=False,
+                        description="Process each GRIB message in blocks of at most this many "
+                        "grid points to bound memory on high-resolution grids. Only "
+                        "regular lat/lon grids are decoded with 1-D axes; other grids "
+                        "still hold full lat/lon/value arrays per message.",
+                    ),
+                    th.Property(
+                        "use_float32",
+                        th.BooleanType(),
+                        required=False,
+                        description="Hold decoded values as float32 to halve memory "
+                        "(values lose precision beyond ~7 significant digits).",
+                    ),
+                    th.Property(
+                        "run_datetime_start",
+                        th.DateTimeType(),
+                        required=False,
+                        description="Keep messages whose run_datetime is >= this value.",
+                    ),
+                    th.Property(
+                        "run_datetime_end",
+                        th.DateTimeType(),
+                        required=False,
+                        description="Keep messages whose run_datetime is < this value.",
+                    ),
+                    th.Property(
+                        "interval_datetime_start",
+                        th.DateTimeType(),
+                        required=False,
+                        description="Keep messages whose interval_start_datetime is >= this value.",
+                    ),
+                    th.Property(
+                        "interval_datetime_end",
+                        th.DateTimeType(),
+                        required=False,
+                        description="Keep messages whose interval_start_datetime is < this value.",
+                    ),
+                    th.Property(
+                        "filename_datetime_template",
+                        th.StringType(),
+                        required=False,
+                        description="File name template carrying a timestamp, e.g. "
+                        "'era5_{YYYYMMDD}.grib' (tokens YYYY, MM, DD, HH; '*' matches anything). "
+                        "Files whose timestamp span is outside the window selected by "
+                        "filename_datetime_kind are skipped without being opened.",
+                    ),
+                    th.Property(
+                        "filename_datetime_kind",
+                        th.StringType(allowed_values=["run", "interval"]),
+                        required=False,
+                        description="What the file name timestamp encodes: the model run "
+                        "('run', default; pruned against run_datetime_start/end) or the "
+                        "valid time ('interval'; pruned against interval_datetime_start/end).",
+                    ),
+                    th.Property(
+                        "latest_run_only",
+                        th.BooleanType(),
+                        required=False,
+                        description="Scan message headers of all files first and emit each "
+                        "field (name, level, ensemble, interval) only from its newest run.",
+                    ),
+                    th.Property(
+                        "emit_changes_only",
+                        th.BooleanType(),
+                        required=False,
+                        description="Emit only grid points whose value changed since the "
+                        "field (name, level, ensemble, interval, grid) was last emitted. "
+                        "Not supported with aggregate_period.",
+                    ),
+                    th.Property(
+                        "change_abs_tolerance",
+                        th.NumberType(),
+                        required=False,
+                        description="Absolute difference below which a value is unchanged.",
+                    ),
+                    th.Property(
+                        "change_rel_tolerance",
+                        th.NumberType(),
+                        required=False,
+                        description="Relative difference below which a value is unchanged.",
+                    ),
+                    th.Property(
+                        "change_store_path",
+                        th.StringType(),
+                        required=False,
+                        description="Directory keeping the last emitted values per field "
+                        "(default: tap-grib-changes/<stream> in the system temp dir).",
+                    ),
+                    th.Property(
+                        "change_store_max_entries",
+                        th.IntegerType(),
+                        required=False,
+                        description="Maximum number of fields kept in the change store "
+                        "(default 1000); least recently used are evicted.",
+                    ),
+                    th.Property(
+                        "change_store_max_bytes",
+                        th.IntegerType(),
+                        required=False,
+                        description="Maximum size in bytes of the change store.",
+                    ),
+                    th.Property(
+                        "decode_workers",
+                        th.IntegerType(),
+                        required=False,
+                        description="Worker processes decoding the messages of each file in "
+                        "parallel (default 1, serial). Records keep the file message order.",
+                    ),
+                    th.Property(
+                        "aggregate_period",
+                        th.StringType(),
+                        required=False,
+                        description="Aggregate values over time buckets: 'day' (calendar "
+                        "day in aggregate_timezone) or 'Nh' (N-hour bins, e.g. '3h'). Emits "
+                        "one row per point and bucket with value_<function> columns once "
+                        "a later message of the same field closes the bucket. Runs are "
+                        "not told apart: use latest_run_only for forecast data.",
+                    ),
+                    th.Property(
+                        "aggregate_timezone",
+                        th.StringType(),
+                        required=False,
+                        description="IANA timezone of calendar-day buckets (default UTC).",
+                    ),
+                    th.Property(
+                        "aggregate_functions",
+                        th.ArrayType(
+                            th.StringType(allowed_values=list(AGGREGATE_FUNCTIONS))
+                        ),
+                        required=False,
+                        description="Statistics emitted per bucket (default min, mean, max).",
+                    ),
+                    th.Property(
+                        "aggregate_store_path",
+                        th.StringType(),
+                        required=False,
+                        description="Directory keeping open buckets between files and "
+                        "syncs (default: tap-grib-aggregates/<stream> in the system temp dir).",
+                    ),
+                    th.Property(
+                        "aggregate_flush",
+                        th.BooleanType(),
+                        required=False,
+                        description="Emit the buckets still open at the end of each sync "
+                        "(finite backfills); later messages for them are dropped. With "
+                        "interval_datetime_end set, buckets starting before it are emitted "
+                        "at the end of each sync.",
+                    ),
+                    th.Property(
+                        "target_resolution",
+                        th.NumberType(),
+                        required=False,
+                        description="Remap every message onto a regular lat/lon grid of "
+                        "this resolution in degrees (e.g. 0.5): block mean on regular "
+                        "lat/lon grids, regrid_method on other grids.",
+                    ),
+                    th.Property(
+                        "regrid_method",
+                        th.StringType(allowed_values=list(REGRID_METHODS)),
+                        required=False,
+                        description="Remapping of non regular lat/lon grids: 'nearest' "
+                        "(default) or 'bilinear' (grids with separate lat/lon axes).",
+                    ),
+                    th.Property(
+                        "split_by",
+                        th.StringType(allowed_values=list(SPLIT_BY)),
+                        required=False,
+                        description="Create one stream per variable ('name') or per "
+                        "variable and level type ('name+level_type') found in the files, "
+                        "named <table_name>_<variable>[_<level_type>], children of a "
+                        "<table_name>_files stream (unselected by default) that reads each "
+                        "file once and feeds it to all of them. Discovery (--discover too, "
+                        "even with discovery_mode: config) lists the files and scans the "
+                        "headers of those not yet indexed, downloading compressed ones in "
+                        "full.",
+                    ),
                 )
             ),
             required=True,
             description="List of GRIB file path definitions (supports globs).",
         ),
+        th.Property(
+            "discovery_mode",
+            th.StringType(allowed_values=["glob", "config", "cache"]),
+            default="glob",
+            description="How streams are discovered: 'glob' lists every path pattern, "
+            "'config' builds streams from config alone and lists files at sync time, "
+            "'cache' reuses a cached file listing (see discovery_cache_ttl). "
+            "Only 'glob' makes remote calls during discovery.",
+        ),
+        th.Property(
+            "discovery_cache_path",
+            th.StringType(),
+            required=False,
+            description="File holding cached listings for discovery_mode 'cache' "
+            "(default: tap-grib-listing.json in the system temp dir).",
+        ),
+        th.Property(
+            "discovery_cache_ttl",
+            th.IntegerType(),
+            default=3600,
+            description="Seconds a cached file listing stays valid.",
+        ),
+        th.Property(
+            "plan_rows_per_second",
+            th.NumberType(),
+            required=False,
+            description="Throughput used by --plan runtime estimates "
+            "(default: benchmarked on the first message of each stream).",
+        ),
+        th.Property(
+            "plan_bytes_per_second",
+            th.NumberType(),
+            required=False,
+            description="Transfer and decompression throughput, in stored bytes per "
+            "second, used by --plan runtime estimates (default: benchmarked on "
+            "the first MiBs of the first file of each stream).",
+        ),
     ).to_dict()
 
     def _parse_bboxes(
@@ -109,11 +332,31 @@ class TapGrib(Tap):
             valid_bboxes.append((min_lon, min_lat, max_lon, max_lat))
         return valid_bboxes
 
+    def _change_store(self, entry: dict, stream_name: str) -> ChangeStore | None:
+        """Change store for a path entry with emit_changes_only enabled."""
+        if not entry.get("emit_changes_only", False):
+            return None
+        directory = entry.get("change_store_path") or os.path.join(
+            tempfile.gettempdir(), "tap-grib-changes", stream_name
+        )
+        return ChangeStore(
+            directory,
+            max_entries=entry.get("change_store_max_entries", 1000),
+            max_bytes=entry.get("change_store_max_bytes"),
+        )
+
+    @staticmethod
+    def _sanitize_name(text: str) -> str:
+        return re.sub(r"[^0-9a-zA-Z]+", "_", text).strip("_").lower()
+
     def default_stream_name(self, pattern: str) -> str:
-        base = os.path.splitext(os.path.basename(pattern))[0]
+        base = os.path.basename(pattern)
+        if compression_from_name(base):
+            base = os.path.splitext(base)[0]
+        base = os.path.splitext(base)[0]
 
         # sanitize
-        safe = re.sub(r"[^0-9a-zA-Z]+", "_", base).strip("_").lower()
+        safe = self._sanitize_name(base)
 
         # Fallback if empty
         if not safe:
@@ -125,6 +368,14 @@ class TapGrib(Tap):
         """Discover a single stream per path pattern (merging all matching files)."""
         streams: list[Stream] = []
 
+        discovery_mode = self.config.get("discovery_mode", "glob")
+        listing_cache: ListingCache | None = None
+        if discovery_mode == "cache":
+            listing_cache = ListingCache(
+                self.config.get("discovery_cache_path"),
+                ttl=self.config.get("discovery_cache_ttl", 3600),
+            )
+
         for entry in self.config.get("paths", []):
             pattern = entry["path"]
             ignore_fields = set(entry.get("ignore_fields", []))
@@ -133,17 +384,53 @@ class TapGrib(Tap):
 
             skip_past = entry.get("skip_past", False)
             skip_past_reference = entry.get("skip_past_reference", None)
+            max_points_per_chunk = entry.get("max_points_per_chunk", None)
+            use_float32 = entry.get("use_float32", False)
+            time_windows = {
+                key: entry.get(key)
+                for key in (
+                    "run_datetime_start",
+                    "run_datetime_end",
+                    "interval_datetime_start",
+                    "interval_datetime_end",
+                    "filename_datetime_template",
+                    "filename_datetime_kind",
+                )
+            }
+            latest_run_only = entry.get("latest_run_only", False)
+            split_by = entry.get("split_by")
+
+            file_list: list[str] | None = None
+            files: list[FileInfo] | None = None
+            if split_by:
+                # sub-streams depend on the files' contents: list them now
+                files = listing_cache.get(pattern) if listing_cache else None
+                if files is None:
+                    files = Storage(pattern).glob_info()
+                    if listing_cache is not None:
+                        listing_cache.put(pattern, files)
+                file_list = [f.path for f in files]
+            elif discovery_mode == "glob":
+                storage = Storage(pattern)
+                file_list = list(storage.glob())
+            elif listing_cache is not None:
+                cached = listing_cache.get(pattern)
+                if cached is not None:
+                    file_list = [f.path for f in cached]
 
-            storage = Storage(pattern)
-            file_list = list(storage.glob())
-            if not file_list:
+            if file_list is not None and not file_list:
                 self.logger.warning(f"No files found for pattern: {pattern}")
                 continue
 
             stream_name = table_name or self.default_stream_name(pattern)
-            self.logger.info(
-                f"Creating stream '{stream_name}' for {len(file_list)} files under pattern {pattern}"
-            )
+            if file_list is None:
+                self.logger.info(
+                    f"Creating stream '{stream_name}' for pattern {pattern} (files listed at sync time)"
+                )
+            else:
+                self.logger.info(
+                    f"Creating stream '{stream_name}' for {len(file_list)} files under pattern {pattern}"
+                )
             if bboxes:
                 for bbox in bboxes:
                     min_lon, min_lat, max_lon, max_lat = bbox
@@ -151,18 +438,152 @@ class TapGrib(Tap):
                         f"bbox filter min_lon={min_lon}, min_lat={min_lat}, max_lon={max_lon}, max_lat={max_lat}"
                     )
 
+            stream_kwargs = dict(
+                file_path=None,
+                primary_keys=self.config.get("primary_keys", None),
+                ignore_fields=ignore_fields,
+                extra_files=file_list if discovery_mode == "glob" else None,
+                file_pattern=pattern,
+                listing_cache=listing_cache,
+                **time_windows,
+                latest_run_only=latest_run_only,
+                change_abs_tolerance=entry.get("change_abs_tolerance"),
+                change_rel_tolerance=entry.get("change_rel_tolerance"),
+                decode_workers=entry.get("decode_workers"),
+                aggregate_period=entry.get("aggregate_period"),
+                aggregate_timezone=entry.get("aggregate_timezone"),
+                aggregate_functions=entry.get("aggregate_functions"),
+                aggregate_store_path=entry.get("aggregate_store_path"),
+                aggregate_flush=entry.get("aggregate_flush", False),
+                target_resolution=entry.get("target_resolution"),
+                regrid_method=entry.get("regrid_method"),
+                bboxes=bboxes,
+                skip_past=skip_past,
+                skip_past_reference=skip_past_reference,
+                max_points_per_chunk=max_points_per_chunk,
+                use_float32=use_float32,
+            )
+
+            if split_by:
+                streams.extend(
+                    self._split_streams(
+                        entry, stream_name, split_by, files or [], stream_kwargs
+                    )
+                )
+                continue
+
             streams.append(
                 GribStream(
                     tap=self,
                     name=stream_name,
-                    file_path=None,
-                    primary_keys=self.config.get("primary_keys", None),
-                    ignore_fields=ignore_fields,
-                    extra_files=file_list,
-                    bboxes=bboxes,
-                    skip_past=skip_past,
-                    skip_past_reference=skip_past_reference,
+                    change_store=self._change_store(entry, stream_name),
+                    **stream_kwargs,
                 )
             )
 
         return streams
+
+    def _split_streams(
+        self,
+        entry: dict,
+        stream_name: str,
+        split_by: str,
+        files: list[FileInfo],
+        stream_kwargs: dict[str, t.Any],
+    ) -> list[Stream]:
+        """
+        One stream per split key found in files, all children of one files
+        stream feeding them file by file from a single splitter.
+        """
+        splitter = FileSplitter(split_by, self.logger)
+        found = splitter.discover(files)
+        if not found:
+            return []
+
+        # the SDK links children to parents by class: one pair per path entry
+        parent_cls = type(f"SplitFilesStream_{stream_name}", (SplitFilesStream,), {})
+        child_cls = type(
+            f"GribStream_{stream_name}",
+            (GribStream,),
+            {"parent_stream_type": parent_cls},
+        )
+        parent_name = self._sanitize_name(f"{stream_name}_files")
+        streams: list[Stream] = [
+            parent_cls(tap=self, name=parent_name, splitter=splitter, files=files)
+        ]
+        for key in sorted(found):
+            name = self._sanitize_name(f"{stream_name}_{key.replace('|', '_')}")
+            # narrow schema: drop columns constant (split on) or never set
+            dropped = {field for field in OPTIONAL_FIELDS if field not in found[key]}
+            if "typeOfLevel" in SPLIT_BY[split_by]:
+                dropped.add("level_type")
+            self.logger.info(f"Creating split stream '{name}' for {key}")
+
+            stream = child_cls(
+                tap=self,
+                name=name,
+                change_store=self._change_store(entry, name),
+                splitter=splitter,
+                split_key=key,
+                **{
+                    **stream_kwargs,
+                    "ignore_fields": stream_kwargs["ignore_fields"] | dropped,
+                    "file_infos": files,
+                },
+            )
+            splitter.streams[key] = stream
+            streams.append(stream)
+        return streams
+
+    def run_plan(self) -> dict[str, t.Any]:
+        """Header-only dry run: per stream and file, what a sync would emit."""
+        rows_per_second = self.config.get("plan_rows_per_second")
+        bytes_per_second = self.config.get("plan_bytes_per_second")
+        streams = [
+            stream.plan(rows_per_second, bytes_per_second)
+            for stream in self.discover_streams()
+            if isinstance(stream, GribStream)
+        ]
+        return {"streams": streams}
+
+    @classmethod
+    def cb_plan(
+        cls,
+        ctx: click.Context,
+        param: click.Option,  # noqa: ARG003
+        value: bool,  # noqa: FBT001
+    ) -> None:
+        """CLI callback printing the --plan report and exiting."""
+        if not value:
+            return
+
+        config = ctx.params.get("config")
+        state = ctx.params.get("state")
+        tap = cls(
+            config=config.config if config else None,
+            state=json.load(state) if state else None,
+            parse_env_config=config.parse_env if config else False,
+            validate_config=True,
+            setup_mapper=False,
+        )
+        click.echo(json.dumps(tap.run_plan(), indent=2, default=str))
+        ctx.exit()
+
+    @classmethod
+    def get_singer_command(cls) -> click.Command:
+        command = super().get_singer_command()
+        for param in command.params:
+            # --plan applies the bookmarks, so read --state before it
+            if param.name == "state":
+                param.is_eager = True
+        command.params.append(
+            click.Option(
+                ["--plan"],
+                is_flag=True,
+                help="Scan message headers and report messages, rows, output bytes "
+                "and runtime per stream and file, without extracting.",
+                callback=cls.cb_plan,
+                expose_value=False,
+            )
+        )
+        return command
@@ -0,0 +1,99 @@
+"""Shared fixtures for tap-grib tests."""
+
+from __future__ import annotations
+import json
+import os
+import typing as t
+import numpy as np
+import pygrib
+import pytest
+from tap_grib.tap import TapGrib
+
+if t.TYPE_CHECKING:
+    from singer_sdk import Stream
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "test.grib")
+
+
+def write_regular_grib(path: str, fields: list[dict[str, t.Any]]) -> str:
+    """
+    Write a GRIB1 file of regular lat/lon messages derived from data/test.grib.
+
+    Each field dict needs ``values`` (2-D, north to south) and may set
+    ``lat0``/``lon0``/``step`` (grid origin and increment, degrees) plus any
+    GRIB key (e.g. ``shortName``, ``dataDate``, ``P1``).
+    """
+    with open(path, "wb") as out:
+        for field in fields:
+            field = dict(field)
+            values = np.asarray(field.pop("values"), dtype=float)
+            lat0 = field.pop("lat0", 50.0)
+            lon0 = field.pop("lon0", 5.0)
+            step = field.pop("step", 0.5)
+            nj, ni = values.shape
+
+            with pygrib.open(SAMPLE_FILE) as grbs:  # type: ignore[attr-defined]
+                msg = grbs.message(1)
+            msg["Ni"] = ni
+            msg["Nj"] = nj
+            msg["latitudeOfFirstGridPointInDegrees"] = lat0
+            msg["latitudeOfLastGridPointInDegrees"] = lat0 - step * (nj - 1)
+            msg["longitudeOfFirstGridPointInDegrees"] = lon0
+            msg["longitudeOfLastGridPointInDegrees"] = lon0 + step * (ni - 1)
+            msg["iDirectionIncrementInDegrees"] = step
+            msg["jDirectionIncrementInDegrees"] = step
+            for key, value in field.items():
+                msg[key] = value
+            if np.isnan(values).any():
+                msg["bitmapPresent"] = 1
+                values = np.where(np.isnan(values), msg.missingValue, values)
+            msg.values = values
+            out.write(msg.tostring())
+    return path
+
+
+def records(stream: Stream) -> t.Iterator[dict[str, t.Any]]:
+    """Records of a stream's ``get_records(None)`` (GribStream yields plain dicts)."""
+    for record in stream.get_records(None):
+        assert isinstance(record, dict)
+        yield record
+
+
+def rows(path: str, **options: t.Any) -> list[dict[str, t.Any]]:
+    """All records of the stream for a single ``paths`` entry."""
+    config = {"paths": [{"path": path, **options}]}
+    tap = TapGrib(config=config, catalog={}, state={})
+    return list(records(tap.discover_streams()[0]))
+
+
+def sync(
+    config: dict[str, t.Any],
+    capsys: pytest.CaptureFixture[str],
+    state: dict[str, t.Any] | None = None,
+) -> tuple[dict[str, list[dict[str, t.Any]]], dict[str, t.Any]]:
+    """Run a full sync; return the emitted records per stream and the final state."""
+    capsys.readouterr()
+    tap = TapGrib(config=config, state=state or {})
+    tap.sync_all()
+    emitted: dict[str, list[dict[str, t.Any]]] = {}
+    for line in capsys.readouterr().out.splitlines():
+        message = json.loads(line)
+        if message["type"] == "RECORD":
+            emitted.setdefault(message["stream"], []).append(message["record"])
+    return emitted, t.cast("dict[str, t.Any]", tap.state)
+
+
+@pytest.fixture
+def sample_file() -> str:
+    return os.path.abspath(SAMPLE_FILE)
+
+
+@pytest.fixture
+def regular_grib(tmp_path) -> str:
+    """A single 2t message on a 6x8 regular grid with one missing point."""
+    values = np.arange(48, dtype=float).reshape(6, 8)
+    values[0, 0] = np.nan
+    return write_regular_grib(
+        str(tmp_path / "regular.grib"),
+        [{"values": values, "shortName": "2t"}],
+    )
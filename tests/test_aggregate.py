@@ -0,0 +1,202 @@
+"""Temporal aggregation into calendar-day and N-hour buckets."""
+
+from __future__ import annotations
+import copy
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import numpy as np
+import pytest
+from tap_grib.aggregate import bucket_bounds, parse_period
+from tap_grib.tap import TapGrib
+from tests.conftest import sync, write_regular_grib
+
+DAY1 = "2025-01-01T00:00:00.000000+00:00"
+DAY2 = "2025-01-02T00:00:00.000000+00:00"
+
+
+def _write_hours(path, date: int, hours: range, offset: float = -1000) -> str:
+    """2t messages whose values are the hour, plus NaN at one point."""
+    fields = []
+    for hour in hours:
+        values = np.full((2, 2), float(hour))
+        if hour == 0:
+            values[1, 1] = np.nan
+        fields.append(
+            {
+                "values": values,
+                "shortName": "2t",
+                "dataDate": date,
+                "dataTime": hour * 100,
+            }
+        )
+    write_regular_grib(str(path), fields)
+    mtime = time.time() + offset
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def _sync(directory, capsys, state: dict | None = None, **options) -> tuple[list, dict]:
+    config = {
+        "paths": [
+            {
+                "path": os.path.join(str(directory), "*.grib"),
+                "table_name": "daily",
+                "aggregate_store_path": os.path.join(str(directory), "buckets"),
+                **options,
+            }
+        ]
+    }
+    emitted, state = sync(config, capsys, state)
+    return emitted.get("daily", []), state
+
+
+def test_bucket_bounds():
+    dt = datetime(2025, 3, 30, 5, 30, tzinfo=timezone.utc)
+    assert bucket_bounds(dt, parse_period("3h"), ZoneInfo("UTC")) == (
+        datetime(2025, 3, 30, 3, tzinfo=timezone.utc),
+        datetime(2025, 3, 30, 6, tzinfo=timezone.utc),
+    )
+    # DST change: the local day is 23 hours long
+    start, end = bucket_bounds(dt, parse_period("day"), ZoneInfo("Europe/Rome"))
+    assert start == datetime(2025, 3, 29, 23, tzinfo=timezone.utc)
+    assert end - start == timedelta(hours=23)
+
+    with pytest.raises(ValueError):
+        parse_period("weekly")
+
+
+def test_daily_buckets_span_files_and_syncs(tmp_path, capsys):
+    _write_hours(tmp_path / "a.grib", 20250101, range(0, 12, 6), offset=-3000)
+    _write_hours(tmp_path / "b.grib", 20250101, range(12, 24, 6), offset=-2000)
+    _write_hours(tmp_path / "c.grib", 20250102, range(0, 1), offset=-1000)
+
+    rows, state = _sync(tmp_path, capsys, aggregate_period="day")
+
+    # only the first day is closed (by the 2025-01-02 messages)
+    assert len(rows) == 4
+    assert {r["interval_start_datetime"] for r in rows} == {DAY1}
+    assert {r["interval_end_datetime"] for r in rows} == {DAY2}
+    by_point = {(r["lat"], r["lon"]): r for r in rows}
+    full = by_point[(50.0, 5.0)]
+    assert [full[f"value_{f}"] for f in ("min", "mean", "max")] == [0.0, 9.0, 18.0]
+    assert full["sample_count"] == 4
+    assert "value" not in full and "step_range" not in full
+    assert by_point[(49.5, 5.5)]["sample_count"] == 3
+    assert by_point[(49.5, 5.5)]["value_min"] == 6.0
+
+    # the open second day carries over to the next sync and closes with day 3
+    _write_hours(tmp_path / "d.grib", 20250102, range(6, 24, 6), offset=-500)
+    _write_hours(tmp_path / "e.grib", 20250103, range(0, 1), offset=-400)
+    rows, _ = _sync(tmp_path, capsys, state=state, aggregate_period="day")
+
+    assert {r["interval_start_datetime"] for r in rows} == {DAY2}
+    assert {r["sample_count"] for r in rows} == {4, 3}
+    assert {r["value_mean"] for r in rows if r["sample_count"] == 4} == {9.0}
+
+
+def test_replayed_files_counted_once(tmp_path, capsys):
+    _write_hours(tmp_path / "a.grib", 20250101, range(0, 12, 6), offset=-3000)
+    _, first = _sync(tmp_path, capsys, aggregate_period="day")
+    _write_hours(tmp_path / "b.grib", 20250101, range(12, 24, 6), offset=-2000)
+    _, second = _sync(
+        tmp_path, capsys, state=copy.deepcopy(first), aggregate_period="day"
+    )
+    _write_hours(tmp_path / "c.grib", 20250102, range(0, 1), offset=-1000)
+
+    # the second state was lost: b.grib is read again but already in the bucket
+    rows, _ = _sync(
+        tmp_path, capsys, state=copy.deepcopy(first), aggregate_period="day"
+    )
+    assert {r["sample_count"] for r in rows} == {4, 3}
+
+    # the state closing the day was lost: its bucket file is still there
+    rows, _ = _sync(
+        tmp_path, capsys, state=copy.deepcopy(second), aggregate_period="day"
+    )
+    assert {r["interval_start_datetime"] for r in rows} == {DAY1}
+    assert {r["sample_count"] for r in rows} == {4, 3}
+
+
+def test_finite_backfill_flushes_last_buckets(tmp_path, capsys):
+    _write_hours(tmp_path / "a.grib", 20250101, range(0, 24, 6), offset=-2000)
+    _write_hours(tmp_path / "b.grib", 20250102, range(0, 24, 6), offset=-1000)
+
+    # the window ends inside the second day: it is emitted with the 00:00 message
+    rows, state = _sync(
+        tmp_path,
+        capsys,
+        aggregate_period="day",
+        interval_datetime_end="2025-01-02T06:00:00Z",
+    )
+    assert {r["interval_start_datetime"] for r in rows} == {DAY1, DAY2}
+    day2 = [r for r in rows if r["interval_start_datetime"] == DAY2]
+    assert {r["sample_count"] for r in day2} == {1}
+    assert state["bookmarks"]["daily"]["aggregates"]["open"] == []
+
+    # without a window end, aggregate_flush empties the open buckets
+    rows, state = _sync(tmp_path, capsys, aggregate_period="day", aggregate_flush=True)
+    assert {r["interval_start_datetime"] for r in rows} == {DAY1, DAY2}
+    assert state["bookmarks"]["daily"]["aggregates"]["open"] == []
+
+
+def test_hour_bins_and_functions(tmp_path, capsys):
+    _write_hours(tmp_path / "a.grib", 20250101, range(0, 7))
+
+    rows, _ = _sync(
+        tmp_path, capsys, aggregate_period="3h", aggregate_functions=["first", "sum"]
+    )
+
+    point = sorted(
+        (r for r in rows if (r["lat"], r["lon"]) == (50.0, 5.0)),
+        key=lambda r: r["interval_start_datetime"],
+    )
+    assert [(r["value_first"], r["value_sum"]) for r in point] == [
+        (0.0, 3.0),
+        (3.0, 12.0),
+    ]
+    assert set(rows[0]) >= {"value_first", "value_sum"}
+    assert "value_mean" not in rows[0]
+
+
+def test_schema_and_invalid_options(tmp_path):
+    path = _write_hours(tmp_path / "a.grib", 20250101, range(0, 1))
+    config = {"paths": [{"path": path, "aggregate_period": "day"}]}
+    stream = TapGrib(config=config, state={}).discover_streams()[0]
+    properties = stream.schema["properties"]
+    assert {"value_min", "value_mean", "value_max", "sample_count"} <= set(properties)
+    assert "value" not in properties
+
+    config["paths"][0]["aggregate_timezone"] = "Mars/Olympus"
+    with pytest.raises(ValueError):
+        TapGrib(config=config, state={}).discover_streams()
+
+    config["paths"][0]["aggregate_timezone"] = "UTC"
+    config["paths"][0]["emit_changes_only"] = True
+    config["paths"][0]["change_store_path"] = str(tmp_path / "changes")
+    with pytest.raises(ValueError, match="emit_changes_only"):
+        TapGrib(config=config, state={}).discover_streams()
+
+
+def test_overlapping_runs_warn(tmp_path, capsys, caplog):
+    # the 00 run at +6h and the 06 run analysis are valid at the same time
+    for name, hour, step in (("run00.grib", 0, 6), ("run06.grib", 6, 0)):
+        write_regular_grib(
+            str(tmp_path / name),
+            [
+                {
+                    "values": np.ones((2, 2)),
+                    "dataDate": 20250101,
+                    "dataTime": hour * 100,
+                    "P1": step,
+                }
+            ],
+        )
+
+    _sync(tmp_path, capsys, aggregate_period="day")
+    assert "several runs are valid at 2025-01-01T06:00:00+00:00" in caplog.text
+
+    caplog.clear()
+    _sync(tmp_path, capsys, aggregate_period="day", latest_run_only=True)
+    assert "several runs" not in caplog.text
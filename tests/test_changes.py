@@ -0,0 +1,139 @@
+"""Change-only emission against the previous extraction."""
+
+from __future__ import annotations
+import copy
+import os
+import time
+import numpy as np
+from tap_grib.changes import ChangeStore, changed_mask
+from tap_grib.tap import TapGrib
+from tests.conftest import records, sync, write_regular_grib
+
+
+def test_changed_mask_tolerances():
+    old = np.array([1.0, 2.0, 100.0, np.nan])
+    new = np.ma.masked_invalid(np.array([1.05, 2.5, 101.0, np.nan]))
+
+    assert changed_mask(new, None).all()
+    assert changed_mask(new, old).tolist() == [True, True, True, False]
+    absolute = changed_mask(new, old, abs_tolerance=0.1)
+    assert absolute.tolist() == [False, True, True, False]
+    relative = changed_mask(new, old, rel_tolerance=0.02)
+    assert relative.tolist() == [True, True, False, False]
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    store = ChangeStore(str(tmp_path), max_entries=2)
+    for key in ("a", "b", "c"):
+        store.put(key, np.arange(3.0))
+
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    reopened = ChangeStore(str(tmp_path), max_entries=2)
+    np.testing.assert_array_equal(reopened.get("c"), np.arange(3.0))
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+    # reading an entry keeps it over older writes
+    store.get("b")
+    store.put("d", np.arange(3.0))
+    assert store.get("b") is not None
+    assert store.get("c") is None
+
+
+def test_stream_emits_only_changed_points(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    first = np.ones((3, 3))
+    second = first.copy()
+    second[0, 1] = 5.0
+    second[2, 2] = 1.001  # within tolerance
+    write_regular_grib(str(data / "a.grib"), [{"values": first}])
+    write_regular_grib(str(data / "b.grib"), [{"values": second}])
+
+    config = {
+        "paths": [
+            {
+                "path": str(data / "*.grib"),
+                "emit_changes_only": True,
+                "change_abs_tolerance": 0.01,
+                "change_store_path": str(tmp_path / "store"),
+            }
+        ]
+    }
+    stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    rows = list(records(stream))
+
+    from_b = [r for r in rows if r["_sdc_filename"].endswith("b.grib")]
+    assert len(rows) == 10
+    assert [(r["lat"], r["lon"], r["value"]) for r in from_b] == [(50.0, 5.5, 5.0)]
+
+
+def test_ignored_fields_keep_fields_apart(tmp_path):
+    levels = [
+        {"values": np.ones((2, 2)), "typeOfLevel": "isobaricInhPa", "level": level}
+        for level in (850, 500)
+    ]
+    path = write_regular_grib(str(tmp_path / "levels.grib"), levels)
+    config = {
+        "paths": [
+            {
+                "path": path,
+                "ignore_fields": ["level"],
+                "emit_changes_only": True,
+                "change_store_path": str(tmp_path / "store"),
+            }
+        ]
+    }
+    stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    rows = list(records(stream))
+
+    assert len(rows) == 8
+    assert "level" not in rows[0]
+
+
+def _write_field(path, value: float, offset: float) -> None:
+    write_regular_grib(str(path), [{"values": np.full((2, 2), value)}])
+    mtime = time.time() + offset
+    os.utime(path, (mtime, mtime))
+
+
+def _changes_config(tmp_path) -> dict:
+    return {
+        "paths": [
+            {
+                "path": str(tmp_path / "data" / "*.grib"),
+                "table_name": "changes",
+                "emit_changes_only": True,
+                "change_abs_tolerance": 1.0,
+                "change_store_path": str(tmp_path / "store"),
+            }
+        ]
+    }
+
+
+def test_drift_below_tolerance_accumulates(tmp_path, capsys):
+    (tmp_path / "data").mkdir()
+    state: dict = {}
+    counts = []
+    for step, value in enumerate((0.0, 0.6, 1.2, 1.8)):
+        _write_field(tmp_path / "data" / f"{step}.grib", value, step - 10)
+        emitted, state = sync(_changes_config(tmp_path), capsys, state)
+        counts.append(len(emitted.get("changes", [])))
+
+    # compared with the last emitted 0.0, not the last read value
+    assert counts == [4, 0, 4, 0]
+
+
+def test_replayed_file_compared_with_earlier_emission(tmp_path, capsys):
+    (tmp_path / "data").mkdir()
+    _write_field(tmp_path / "data" / "a.grib", 0.0, -20)
+    _, first = sync(_changes_config(tmp_path), capsys)
+    _write_field(tmp_path / "data" / "b.grib", 5.0, -10)
+    emitted, _ = sync(_changes_config(tmp_path), capsys, copy.deepcopy(first))
+    assert len(emitted["changes"]) == 4
+
+    # the state after b.grib was lost: its records are emitted again
+    emitted, _ = sync(_changes_config(tmp_path), capsys, copy.deepcopy(first))
+    assert len(emitted["changes"]) == 4
+    emitted, _ = sync(_changes_config(tmp_path), capsys, copy.deepcopy(first))
+    assert len(emitted["changes"]) == 4
@@ -0,0 +1,69 @@
+"""Chunked (bounded-memory) message processing."""
+
+from __future__ import annotations
+import logging
+import numpy as np
+import pygrib
+import pytest
+from tap_grib.client import (
+    _decode_grid,
+    _iter_grid_chunks,
+    _peak_rss_bytes,
+    _regular_ll_axes,
+)
+from tests.conftest import rows
+
+
+def test_regular_axes_match_latlons(regular_grib: str):
+    with pygrib.open(regular_grib) as grbs:  # type: ignore[attr-defined]
+        msg = grbs.message(1)
+        lats, lons = msg.latlons()
+        axes = _regular_ll_axes(msg)
+
+    assert axes is not None
+    np.testing.assert_allclose(axes[0], lats[:, 0])
+    np.testing.assert_allclose(axes[1], lons[0, :])
+
+
+def test_chunks_cover_grid_in_order(regular_grib: str):
+    with pygrib.open(regular_grib) as grbs:  # type: ignore[attr-defined]
+        msg = grbs.message(1)
+        lats, lons = msg.latlons()
+        grid = _decode_grid(msg, dtype=np.float32)
+        chunks = list(_iter_grid_chunks(*grid, max_points=5))
+
+    assert [c[2].size for c in chunks] == [5] * 9 + [3]
+    assert all(c[2].dtype == np.float32 for c in chunks)
+    np.testing.assert_allclose(np.concatenate([c[0] for c in chunks]), lats.ravel())
+    np.testing.assert_allclose(np.concatenate([c[1] for c in chunks]), lons.ravel())
+    assert bool(np.ma.getmaskarray(chunks[0][2])[0])
+
+
+def test_chunked_rows_match_unchunked(regular_grib: str):
+    bboxes = [[49.0, 6.0, 47.5, 8.0]]
+    full = rows(regular_grib, bboxes=bboxes)
+    chunked = rows(regular_grib, bboxes=bboxes, max_points_per_chunk=7)
+
+    assert full
+    assert chunked == full
+    assert all(6.0 <= r["lon"] <= 8.0 and 47.5 <= r["lat"] <= 49.0 for r in full)
+
+
+def test_chunked_skips_missing_points(regular_grib: str):
+    emitted = rows(regular_grib, max_points_per_chunk=4, use_float32=True)
+    assert len(emitted) == 47
+    assert (50.0, 5.0) not in {(r["lat"], r["lon"]) for r in emitted}
+
+
+@pytest.mark.skipif(_peak_rss_bytes() is None, reason="needs /proc/self/status")
+def test_peak_rss_logged_per_message(regular_grib: str, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    rows(regular_grib)
+    rows(
+        regular_grib,
+        aggregate_period="day",
+        aggregate_store_path=str(tmp_path / "buckets"),
+    )
+    logged = [r.getMessage() for r in caplog.records if "peak RSS" in r.getMessage()]
+    assert len(logged) == 2
+    assert all(m.endswith(" MiB") for m in logged)
@@ -0,0 +1,88 @@
+"""Compressed GRIB input (.gz, .bz2, .zst)."""
+
+from __future__ import annotations
+import bz2
+import gzip
+import io
+from pathlib import Path
+import pytest
+from tap_grib.storage import Storage, _PrefetchReader, compression_from_magic
+from tests.conftest import rows
+
+
+def _rows(path: str) -> list[dict]:
+    return [
+        {k: v for k, v in r.items() if k not in ("_sdc_filename", "_sdc_last_modified")}
+        for r in rows(path)
+    ]
+
+
+def _compress(sample_file: str, target: str, codec: str) -> str:
+    with open(sample_file, "rb") as fh:
+        raw = fh.read()
+    if codec == "gzip":
+        data = gzip.compress(raw)
+    elif codec == "bz2":
+        data = bz2.compress(raw)
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        data = zstandard.ZstdCompressor().compress(raw)
+    with open(target, "wb") as fh:
+        fh.write(data)
+    return target
+
+
+@pytest.mark.parametrize(
+    ("codec", "suffix"),
+    [("gzip", ".grib.gz"), ("bz2", ".grib.bz2"), ("zstd", ".grib.zst")],
+)
+def test_compressed_rows_match_plain(
+    sample_file: str, tmp_path, codec: str, suffix: str
+):
+    path = _compress(sample_file, str(tmp_path / f"test{suffix}"), codec)
+    assert _rows(path) == _rows(sample_file)
+
+
+def test_compression_detected_by_magic(sample_file: str, tmp_path):
+    path = _compress(sample_file, str(tmp_path / "noext.grib"), "gzip")
+    with open(path, "rb") as fh:
+        assert compression_from_magic(fh.read(4)) == "gzip"
+
+    out = io.BytesIO()
+    stats = Storage(path).copy_to(path, out)
+    with open(sample_file, "rb") as fh:
+        assert out.getvalue() == fh.read()
+    assert stats.compression == "gzip"
+    assert stats.uncompressed_bytes == len(out.getvalue())
+    assert 0 < stats.compressed_bytes < stats.uncompressed_bytes
+
+
+def test_plain_copy_reports_sizes(sample_file: str, tmp_path):
+    target = tmp_path / "copy.grib"
+    with open(target, "wb") as out:
+        stats = Storage(sample_file).copy_to(sample_file, out)
+    assert stats.compression is None
+    assert stats.compressed_bytes == stats.uncompressed_bytes
+    assert target.read_bytes() == Path(sample_file).read_bytes()
+
+
+class _FailingSource(io.BytesIO):
+    """A source whose reads fail after the first 8 bytes."""
+
+    def read(self, size: int | None = -1) -> bytes:
+        if self.tell() >= 8:
+            raise OSError("connection reset")
+        return super().read(size)
+
+
+def test_prefetch_reader_errors_and_close():
+    reader = _PrefetchReader(_FailingSource(b"x" * 64), block_size=4, depth=1)
+    with pytest.raises(OSError, match="connection reset"):
+        reader.read()
+    reader.close()
+    assert not reader._thread.is_alive()
+
+    # closing with a full queue and nobody reading stops the thread
+    reader = _PrefetchReader(io.BytesIO(b"x" * 64), block_size=4, depth=1)
+    reader.close()
+    assert not reader._thread.is_alive()
@@ -0,0 +1,68 @@
+"""Discovery without remote listing and lazy heavy imports."""
+
+from __future__ import annotations
+import subprocess
+import sys
+import pytest
+from tap_grib.storage import ListingCache, Storage
+from tap_grib.tap import TapGrib
+from tests.conftest import records
+
+
+@pytest.fixture
+def no_listing(monkeypatch: pytest.MonkeyPatch):
+    """Fail the test if any glob reaches the storage backend."""
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError(f"unexpected listing of {self.path_glob}")
+
+    monkeypatch.setattr(Storage, "glob", fail)
+    monkeypatch.setattr(Storage, "glob_info", fail)
+
+
+def test_import_does_not_load_pygrib():
+    code = "import sys, tap_grib.tap; print('pygrib' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_config_mode_discovers_without_listing(sample_file: str, no_listing):
+    config = {"paths": [{"path": sample_file}], "discovery_mode": "config"}
+    streams = TapGrib(config=config, catalog={}, state={}).discover_streams()
+    assert [s.name for s in streams] == ["test"]
+
+
+def test_config_mode_lists_at_sync(sample_file: str):
+    config = {"paths": [{"path": sample_file}], "discovery_mode": "config"}
+    stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    assert next(records(stream))["name"]
+
+
+def test_cache_mode_reuses_listing(sample_file: str, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "listing.json")
+    config = {
+        "paths": [{"path": sample_file}],
+        "discovery_mode": "cache",
+        "discovery_cache_path": cache_path,
+    }
+    stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    assert next(records(stream))
+
+    cached = ListingCache(cache_path).get(sample_file)
+    assert cached and cached[0].path == sample_file
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError("listing should come from cache")
+
+    monkeypatch.setattr(Storage, "glob_info", fail)
+    monkeypatch.setattr(Storage, "glob", fail)
+    stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    assert next(records(stream))
+
+
+def test_listing_cache_expires(tmp_path, sample_file: str):
+    cache = ListingCache(str(tmp_path / "listing.json"), ttl=-1)
+    cache.put(sample_file, Storage(sample_file).glob_info())
+    assert cache.get(sample_file) is None
@@ -0,0 +1,156 @@
+"""Latest-run-wins deduplication across overlapping forecast files."""
+
+from __future__ import annotations
+import gzip
+import os
+import time
+import numpy as np
+import pygrib
+from tap_grib.client import iter_message_heads
+from tap_grib.storage import Storage
+from tests.conftest import rows as rows_of
+from tests.conftest import sync, write_regular_grib
+
+
+def _write_run(
+    directory, name: str, hour: int, step: int, value: float, date: int = 20250101
+) -> str:
+    path = write_regular_grib(
+        os.path.join(directory, name),
+        [
+            {
+                "values": np.full((2, 2), value),
+                "dataDate": date,
+                "dataTime": hour * 100,
+                "P1": step,
+            }
+        ],
+    )
+    _touch(path, -1000 + len(os.listdir(directory)))
+    return path
+
+
+def _touch(path, offset: float) -> None:
+    """Set distinct (past) mtimes so the file-level bookmark orders the files."""
+    mtime = time.time() + offset
+    os.utime(path, (mtime, mtime))
+
+
+def _sync(directory, state: dict, capsys) -> tuple[list[dict], dict]:
+    """Sync the runs in directory; return the emitted records and the final state."""
+    config = {
+        "paths": [
+            {
+                "path": os.path.join(str(directory), "*.grib"),
+                "table_name": "runs",
+                "latest_run_only": True,
+            }
+        ]
+    }
+    emitted, state = sync(config, capsys, state)
+    return emitted.get("runs", []), state
+
+
+def test_only_newest_run_is_emitted(tmp_path, capsys):
+    _write_run(tmp_path, "run00.grib", hour=0, step=6, value=1.0)
+    _write_run(tmp_path, "run06.grib", hour=6, step=0, value=2.0)
+
+    rows, _ = _sync(tmp_path, {}, capsys)
+
+    assert len(rows) == 4
+    assert {r["value"] for r in rows} == {2.0}
+    assert {r["run_datetime"][:19] for r in rows} == {"2025-01-01T06:00:00"}
+
+
+def test_state_tracks_superseding_runs(tmp_path, capsys):
+    _write_run(tmp_path, "run00.grib", hour=0, step=6, value=1.0)
+    rows, state = _sync(tmp_path, {}, capsys)
+    assert {r["value"] for r in rows} == {1.0}
+    assert list(state["bookmarks"]["runs"]["latest_runs"].values()) == [
+        "2025-01-01T00:00:00+00:00"
+    ]
+
+    # an older run arriving later never overrides the emitted one
+    _write_run(tmp_path, "run_old.grib", hour=18, step=12, value=9.0, date=20241231)
+    _touch(tmp_path / "run_old.grib", -500)
+    rows, state = _sync(tmp_path, state, capsys)
+    assert rows == []
+
+    # a newer run supersedes the emitted one
+    _write_run(tmp_path, "run06.grib", hour=6, step=0, value=2.0)
+    _touch(tmp_path / "run06.grib", -200)
+    rows, state = _sync(tmp_path, state, capsys)
+    assert {r["value"] for r in rows} == {2.0}
+    assert (
+        "2025-01-01T06:00:00+00:00"
+        in state["bookmarks"]["runs"]["latest_runs"].values()
+    )
+
+
+def test_inventory_reads_headers_by_range(tmp_path, capsys, monkeypatch):
+    _write_run(tmp_path, "run00.grib", hour=0, step=6, value=1.0)
+    _write_run(tmp_path, "run06.grib", hour=6, step=0, value=2.0)
+    copies: list[str] = []
+    copy_to = Storage.copy_to
+
+    def counting_copy(self, path, dst):
+        copies.append(os.path.basename(path))
+        return copy_to(self, path, dst)
+
+    monkeypatch.setattr(Storage, "copy_to", counting_copy)
+    rows, _ = _sync(tmp_path, {}, capsys)
+
+    # only the winning file is downloaded, once, for decoding
+    assert {r["value"] for r in rows} == {2.0}
+    assert copies == ["run06.grib"]
+
+    # compressed files cannot be read by range and are copied for the scan
+    compressed = tmp_path / "run06.grib.gz"
+    compressed.write_bytes(gzip.compress((tmp_path / "run06.grib").read_bytes()))
+    copies.clear()
+    assert len(rows_of(str(compressed), latest_run_only=True)) == 4
+    assert copies == ["run06.grib.gz", "run06.grib.gz"]
+
+
+def test_header_only_messages(tmp_path):
+    values = np.arange(12.0).reshape(3, 4)
+    values[0, 0] = np.nan
+    path = write_regular_grib(str(tmp_path / "g1.grib"), [{"values": values, "P1": 6}])
+    with pygrib.open(path) as grbs:  # type: ignore[attr-defined]
+        grib1 = grbs.message(1)
+    grib2 = pygrib.fromstring(grib1.tostring())
+    grib2["editionNumber"] = 2
+    with open(tmp_path / "g2.grib", "wb") as fh:
+        fh.write(grib1.tostring() + grib2.tostring())
+
+    path = str(tmp_path / "g2.grib")
+    heads = list(iter_message_heads(Storage(path), path, os.path.getsize(path)))
+    assert [pygrib.fromstring(h)["editionNumber"] for _, _, h in heads] == [1, 2]
+    for _, length, head in heads:
+        msg = pygrib.fromstring(head)
+        assert len(head) < length
+        assert (msg["shortName"], msg["stepRange"], msg["Ni"], msg["Nj"]) == (
+            grib1["shortName"],
+            "6",
+            4,
+            3,
+        )
+        assert msg["numberOfMissing"] == 1
+
+
+def test_header_reads_fetch_each_byte_once(sample_file, monkeypatch):
+    fetched: list[tuple[int, int]] = []
+    read_range = Storage.read_range
+
+    def counting_read(self, path, start, end):
+        fetched.append((start, end))
+        return read_range(self, path, start, end)
+
+    monkeypatch.setattr(Storage, "read_range", counting_read)
+    size = os.path.getsize(sample_file)
+    heads = list(iter_message_heads(Storage(sample_file), sample_file, size))
+
+    with pygrib.open(sample_file) as grbs:  # type: ignore[attr-defined]
+        assert len(heads) == grbs.messages
+    assert sum(end - start for start, end in fetched) <= size
+    assert all(a[1] <= b[0] for a, b in zip(fetched, fetched[1:]))
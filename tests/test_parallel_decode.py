@@ -0,0 +1,63 @@
+"""Parallel decoding of the messages of a single file."""
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pygrib
+from tap_grib.client import _ordered_results, _scan_message_offsets
+from tests.conftest import rows, write_regular_grib
+
+
+def test_offsets_match_messages(tmp_path):
+    path = write_regular_grib(
+        str(tmp_path / "multi.grib"),
+        [{"values": np.full((4, 5), float(i)), "P1": i} for i in range(6)],
+    )
+    # padding between messages must be skipped
+    with open(path, "rb") as fh:
+        data = fh.read()
+    offsets = _scan_message_offsets(path)
+    assert offsets is not None and len(offsets) == 6
+    padded = str(tmp_path / "padded.grib")
+    with open(padded, "wb") as fh:
+        for offset, length in offsets:
+            fh.write(b"\0" * 7 + data[offset : offset + length])
+
+    padded_offsets = _scan_message_offsets(padded)
+    assert padded_offsets is not None and len(padded_offsets) == 6
+    with pygrib.open(padded) as grbs:  # type: ignore[attr-defined]
+        for (offset, length), msg in zip(padded_offsets, grbs):
+            with open(padded, "rb") as fh:
+                fh.seek(offset)
+                assert (
+                    pygrib.fromstring(fh.read(length)).values.max() == msg.values.max()
+                )
+
+
+def test_parallel_rows_match_serial(tmp_path):
+    path = write_regular_grib(
+        str(tmp_path / "multi.grib"),
+        [{"values": np.arange(20.0).reshape(4, 5) + i, "P1": i} for i in range(8)],
+    )
+    serial = rows(path)
+    parallel = rows(path, decode_workers=3, max_points_per_chunk=6)
+
+    assert len(serial) == 160
+    assert parallel == serial
+
+
+def test_jobs_submitted_while_scanning():
+    scanned: list[int] = []
+
+    def calls():
+        for i in range(6):
+            scanned.append(i)
+            yield i, (i,)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = _ordered_results(pool, lambda x: x * 10, calls(), window=2)
+        tag, first = next(results)
+        # the first result is available before the scan reached the end
+        assert (tag, first.result(), scanned) == (0, 0, [0, 1])
+        rest = [(tag, f.result()) for tag, f in results]
+        assert rest == [(i, i * 10) for i in range(1, 6)]
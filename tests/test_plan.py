@@ -0,0 +1,136 @@
+"""--plan dry-run estimates."""
+
+from __future__ import annotations
+import gzip
+import json
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from tap_grib.storage import Storage
+from tap_grib.tap import TapGrib
+from tests.conftest import records, rows, write_regular_grib
+
+
+def _forbid_copies(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fail the test if a file is copied (headers must be read by range)."""
+
+    def fail(self, path, dst):
+        raise AssertionError(f"unexpected copy of {path}")
+
+    monkeypatch.setattr(Storage, "copy_to", fail)
+
+
+def test_plan_matches_sync(regular_grib: str, tmp_path, monkeypatch):
+    config = {
+        "paths": [
+            {
+                "path": regular_grib,
+                "bboxes": [[49.0, 6.0, 47.5, 8.0]],
+                "table_name": "regular",
+            }
+        ],
+        "plan_rows_per_second": 1000,
+        "plan_bytes_per_second": 100,
+    }
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps(config))
+    grib_stream = TapGrib(config=config, catalog={}, state={}).discover_streams()[0]
+    rows = list(records(grib_stream))
+
+    _forbid_copies(monkeypatch)
+    result = CliRunner().invoke(TapGrib.cli, ["--config", str(config_file), "--plan"])
+    assert result.exit_code == 0, result.output
+
+    plan = json.loads(result.output)
+    (stream,) = plan["streams"]
+    (file_plan,) = stream["files"]
+
+    assert stream["stream"] == "regular"
+    assert file_plan["messages"] == 1
+    assert file_plan["copied"] is False
+    assert file_plan["points"] == len(rows) == 20
+    assert file_plan["estimated_decode_seconds"] == 0.02
+    transfer = round(file_plan["size"] / 100, 3)
+    assert file_plan["estimated_transfer_seconds"] == transfer
+    assert file_plan["estimated_seconds"] == round(0.02 + transfer, 3)
+    assert file_plan["estimated_bytes"] > 20 * 200
+
+
+def test_plan_applies_filters_and_benchmarks(sample_file: str):
+    config = {
+        "paths": [
+            {
+                "path": sample_file,
+                "run_datetime_start": "2025-01-01T00:00:00Z",
+                "run_datetime_end": "2025-01-01T01:00:00Z",
+            }
+        ]
+    }
+    plan = TapGrib(config=config, catalog={}, state={}).run_plan()
+    totals = plan["streams"][0]["totals"]
+
+    assert 0 < totals["messages"] < 522
+    assert plan["streams"][0]["rows_per_second"] > 0
+    assert plan["streams"][0]["bytes_per_second"] > 0
+
+
+def test_plan_applies_bookmarks(regular_grib: str, tmp_path):
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"paths": [{"path": regular_grib}]}))
+    state_file = tmp_path / "state.json"
+    state_file.write_text(
+        json.dumps(
+            {
+                "bookmarks": {
+                    "regular": {
+                        "replication_key": "_sdc_last_modified",
+                        "replication_key_value": "2999-01-01T00:00:00+00:00",
+                    }
+                }
+            }
+        )
+    )
+
+    # --state is read before --plan whatever the option order
+    args = ["--config", str(config_file), "--plan", "--state", str(state_file)]
+    result = CliRunner().invoke(TapGrib.cli, args)
+    assert result.exit_code == 0, result.output
+
+    (stream,) = json.loads(result.output)["streams"]
+    assert stream["bookmark"] == "2999-01-01T00:00:00+00:00"
+    assert stream["files"] == []
+
+
+def test_plan_flags_copied_files(sample_file: str, tmp_path):
+    path = tmp_path / "test.grib.gz"
+    with open(sample_file, "rb") as fh:
+        path.write_bytes(gzip.compress(fh.read()))
+
+    config = {"paths": [{"path": str(path)}], "plan_rows_per_second": 1000}
+    plan = TapGrib(config=config, catalog={}, state={}).run_plan()
+    (file_plan,) = plan["streams"][0]["files"]
+
+    assert file_plan["copied"] is True
+    assert file_plan["messages"] == 522
+
+
+def test_plan_counts_regridded_and_aggregated_rows(regular_grib: str, tmp_path):
+    def planned_points(path: str, **options) -> int:
+        config = {"paths": [{"path": path, **options}], "plan_rows_per_second": 1000}
+        plan = TapGrib(config=config, catalog={}, state={}).run_plan()
+        return plan["streams"][0]["totals"]["points"]
+
+    assert planned_points(regular_grib, target_resolution=1.0) == 15
+    assert len(rows(regular_grib, target_resolution=1.0)) == 15
+
+    # four 6-hourly messages make a single daily bucket
+    values = [np.full((2, 2), float(hour)) for hour in (0, 6, 12, 18)]
+    values[0][0, 0] = np.nan
+    fields = [
+        {"values": v, "dataDate": 20250101, "dataTime": hour * 100}
+        for v, hour in zip(values, (0, 6, 12, 18))
+    ]
+    path = write_regular_grib(str(tmp_path / "day.grib"), fields)
+    assert planned_points(path) == 15
+    assert planned_points(path, aggregate_period="day") == 4
+    assert planned_points(path, aggregate_period="6h") == 15
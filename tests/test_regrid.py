@@ -0,0 +1,92 @@
+"""Remapping to a coarser regular lat/lon grid."""
+
+from __future__ import annotations
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from tap_grib.client import _grid_id
+from tap_grib.regrid import Regridder
+from tests.conftest import rows, write_regular_grib
+
+LATS = np.arange(50.0, 47.0, -0.5)
+LONS = np.arange(5.0, 9.0, 0.5)
+
+
+def _flat_grid(values: np.ndarray) -> tuple:
+    """The 6x8 test grid as a non-regular grid (full coordinate arrays)."""
+    lats, lons = np.meshgrid(LATS, LONS, indexing="ij")
+    return lats.ravel(), lons.ravel(), np.ma.masked_invalid(values.ravel()), False
+
+
+def test_block_mean_on_regular_grid(regular_grib: str):
+    emitted = rows(regular_grib, target_resolution=1.0)
+    values = {(r["lat"], r["lon"]): r["value"] for r in emitted}
+
+    assert len(emitted) == 15
+    # cell (50, 5) holds (50, 5), missing, and (49.5, 5)
+    assert values[(50.0, 5.0)] == 8.0
+    # cell (49, 6) averages the 2x2 block (49|48.5) x (5.5|6)
+    assert values[(49.0, 6.0)] == np.mean([17, 18, 25, 26])
+
+
+def test_not_coarser_keeps_native_grid(regular_grib: str):
+    assert rows(regular_grib, target_resolution=0.5) == rows(regular_grib)
+
+
+def test_weights_built_once_per_geometry(tmp_path, monkeypatch):
+    path = write_regular_grib(
+        str(tmp_path / "two.grib"),
+        [
+            {"values": np.ones((6, 8)), "shortName": "2t"},
+            {"values": np.zeros((6, 8)), "shortName": "2d"},
+        ],
+    )
+    built: list[int] = []
+    weights = Regridder.weights
+
+    def counting_weights(self, grid):
+        built.append(grid[2].size)
+        return weights(self, grid)
+
+    monkeypatch.setattr(Regridder, "weights", counting_weights)
+    emitted = rows(path, target_resolution=1.0)
+
+    assert built == [48]
+    assert {r["name"]: r["value"] for r in emitted} == {"2t": 1.0, "2d": 0.0}
+
+
+def test_grid_id_fallback_tells_shifted_grids_apart():
+    shape = {"gridType": "regular_ll", "Ni": 8, "Nj": 6, "numberOfDataPoints": 48}
+    north = SimpleNamespace(latitudeOfFirstGridPointInDegrees=50.0, **shape)
+    south = SimpleNamespace(latitudeOfFirstGridPointInDegrees=40.0, **shape)
+    assert _grid_id(north) != _grid_id(south)
+    assert _grid_id(north) == _grid_id(SimpleNamespace(**vars(north)))
+
+
+def test_nearest_and_bilinear_on_other_grids():
+    lats, lons = np.meshgrid(LATS, LONS, indexing="ij")
+    field = lats * 10 + lons
+
+    nearest = Regridder(1.0, "nearest")(_flat_grid(field), "g")
+    assert list(nearest[0]) == [50.0, 49.0, 48.0]
+    assert list(nearest[1]) == [5.0, 6.0, 7.0, 8.0, 9.0]
+    assert nearest[3] is True
+    # nearest source of (49, 6) is the point itself
+    assert nearest[2].reshape(3, 5)[1, 1] == 496.0
+
+    bilinear = Regridder(1.0, "bilinear")(_flat_grid(field), "g")
+    assert list(bilinear[1]) == [5.0, 6.0, 7.0, 8.0]
+    expected = np.add.outer(np.array([50.0, 49.0, 48.0]) * 10, [5.0, 6.0, 7.0, 8.0])
+    np.testing.assert_allclose(bilinear[2].reshape(3, 4), expected)
+
+    # missing corners are left out of the interpolation weights
+    field[1, 1] = np.nan
+    bilinear = Regridder(1.0, "bilinear")(_flat_grid(field), "g")
+    assert not np.ma.is_masked(bilinear[2])
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        Regridder(0)
+    with pytest.raises(ValueError):
+        Regridder(1.0, "cubic")
@@ -0,0 +1,152 @@
+"""Per-variable sub-streams fed by a single pass over each file."""
+
+from __future__ import annotations
+import os
+import numpy as np
+import pytest
+from tap_grib.split import FileSplitter
+from tap_grib.storage import Storage
+from tap_grib.tap import TapGrib
+from tests.conftest import sync, write_regular_grib
+
+
+@pytest.fixture
+def mixed_dir(tmp_path, monkeypatch):
+    """Two files with t on two level types and 2t, plus a private split index."""
+    monkeypatch.setattr(
+        FileSplitter, "DEFAULT_INDEX_PATH", str(tmp_path / "split.json")
+    )
+    data = tmp_path / "data"
+    data.mkdir()
+    for day in (1, 2):
+        write_regular_grib(
+            str(data / f"day{day}.grib"),
+            [
+                {
+                    "values": np.full((2, 2), 500.0 + day),
+                    "shortName": "t",
+                    "typeOfLevel": "isobaricInhPa",
+                    "level": 500,
+                    "dataDate": 20250100 + day,
+                },
+                {
+                    "values": np.full((2, 2), 280.0 + day),
+                    "shortName": "t",
+                    "typeOfLevel": "surface",
+                    "dataDate": 20250100 + day,
+                },
+                {
+                    "values": np.full((2, 2), 290.0 + day),
+                    "shortName": "2t",
+                    "dataDate": 20250100 + day,
+                },
+            ],
+        )
+        mtime = os.path.getmtime(data / f"day{day}.grib") - 1000 + day
+        os.utime(data / f"day{day}.grib", (mtime, mtime))
+    return data
+
+
+def _config(directory, split_by: str | None, **options) -> dict:
+    entry = {
+        "path": os.path.join(str(directory), "*.grib"),
+        "table_name": "era5",
+        **options,
+    }
+    if split_by:
+        entry["split_by"] = split_by
+    return {"paths": [entry]}
+
+
+def _count_copies(monkeypatch) -> list[str]:
+    copies: list[str] = []
+    copy_to = Storage.copy_to
+
+    def counting_copy(self, path, dst):
+        copies.append(os.path.basename(path))
+        return copy_to(self, path, dst)
+
+    monkeypatch.setattr(Storage, "copy_to", counting_copy)
+    return copies
+
+
+def test_streams_per_combination(mixed_dir):
+    tap = TapGrib(config=_config(mixed_dir, "name+level_type"), state={})
+    streams = {s.name: s for s in tap.discover_streams()}
+
+    assert sorted(streams) == [
+        "era5_2t_surface",
+        "era5_files",
+        "era5_t_isobaricinhpa",
+        "era5_t_surface",
+    ]
+    # the files stream only drives its sub-streams
+    assert not streams["era5_files"].selected
+    properties = streams["era5_t_surface"].schema["properties"]
+    assert "level_type" not in properties
+    assert {"name", "value", "level"} <= set(properties)
+
+    by_name = TapGrib(config=_config(mixed_dir, "name"), state={}).streams
+    assert sorted(by_name) == ["era5_2t", "era5_files", "era5_t"]
+    assert "level_type" in by_name["era5_t"].schema["properties"]
+    children = by_name["era5_files"].child_streams
+    assert sorted(s.name for s in children) == ["era5_2t", "era5_t"]
+
+
+def test_split_rows_match_unsplit(mixed_dir, capsys):
+    split_rows, state = sync(_config(mixed_dir, "name"), capsys)
+    rows, _ = sync(_config(mixed_dir, None), capsys)
+
+    assert {s: len(r) for s, r in split_rows.items()} == {"era5_2t": 8, "era5_t": 16}
+    assert all(r["name"] == "t" for r in split_rows["era5_t"])
+
+    def key(r: dict) -> tuple:
+        return r["name"], r["level_type"], r["run_datetime"], r["lat"], r["lon"]
+
+    merged = split_rows["era5_2t"] + split_rows["era5_t"]
+    assert sorted(merged, key=key) == sorted(rows["era5"], key=key)
+
+    bookmarks = state["bookmarks"]
+    assert {"era5_2t", "era5_t"} <= set(bookmarks)
+    rows, _ = sync(_config(mixed_dir, "name"), capsys, state=state)
+    assert rows == {}
+
+
+def test_each_file_read_once(mixed_dir, capsys, monkeypatch):
+    copies = _count_copies(monkeypatch)
+
+    # discovery reads the headers by range, the first sub-stream splits each file
+    rows, _ = sync(_config(mixed_dir, "name+level_type"), capsys)
+    assert len(rows) == 3
+    assert sorted(copies) == ["day1.grib", "day2.grib"]
+
+    # with the index warm, the first sub-stream splits each file for all of them
+    copies.clear()
+    rows, _ = sync(_config(mixed_dir, "name+level_type"), capsys)
+    assert sum(len(r) for r in rows.values()) == 24
+    assert sorted(copies) == ["day1.grib", "day2.grib"]
+
+
+def test_parts_dropped_per_file(mixed_dir, capsys, monkeypatch):
+    copies = _count_copies(monkeypatch)
+    split = FileSplitter.split
+    live: list[set[str]] = []
+    splitters: list[FileSplitter] = []
+
+    def recording_split(self, info, keys):
+        found = split(self, info, keys)
+        live.append({path for path, parts in self._parts.items() if parts})
+        splitters.append(self)
+        return found
+
+    monkeypatch.setattr(FileSplitter, "split", recording_split)
+    rows, _ = sync(_config(mixed_dir, "name"), capsys)
+
+    # every sub-stream reads a file before the next one is split
+    assert {s: len(r) for s, r in rows.items()} == {"era5_2t": 8, "era5_t": 16}
+    assert [sorted(os.path.basename(p) for p in paths) for paths in live] == [
+        ["day1.grib"],
+        ["day2.grib"],
+    ]
+    assert sorted(copies) == ["day1.grib", "day2.grib"]
+    assert os.listdir(splitters[0]._workdir.name) == []
@@ -0,0 +1,104 @@
+"""Run/interval time windows and file name pruning."""
+
+from __future__ import annotations
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from tap_grib.client import filename_datetime_span
+from tap_grib.storage import Storage
+from tap_grib.tap import TapGrib
+from tests.conftest import records, write_regular_grib
+
+
+def _stream(path: str, **options):
+    tap = TapGrib(config={"paths": [{"path": path, **options}]}, catalog={}, state={})
+    return tap.discover_streams()[0]
+
+
+def test_filename_datetime_span():
+    start, end = filename_datetime_span(
+        "/data/era5_20250131.grib", "era5_{YYYYMMDD}.grib"
+    )
+    assert start == datetime(2025, 1, 31, tzinfo=timezone.utc)
+    assert end == datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+    start, end = filename_datetime_span(
+        "icon_2025-12_x.grib2", "icon_{YYYY-MM}_*.grib2"
+    )
+    assert (start.month, end.year, end.month) == (12, 2026, 1)
+
+    assert filename_datetime_span("other.grib", "era5_{YYYYMMDD}.grib") is None
+
+
+def test_run_window_filters_messages(sample_file: str):
+    stream = _stream(
+        sample_file,
+        run_datetime_start="2025-01-01T00:00:00Z",
+        run_datetime_end="2025-01-02T00:00:00Z",
+    )
+    rows = list(records(stream))
+    assert rows
+    assert min(r["run_datetime"] for r in rows) == datetime(
+        2025, 1, 1, tzinfo=timezone.utc
+    )
+    assert len(rows) < len(list(records(_stream(sample_file))))
+
+
+def test_interval_window_filters_messages(sample_file: str):
+    end = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    stream = _stream(sample_file, interval_datetime_end=end.isoformat())
+    rows = list(records(stream))
+    assert rows
+    assert all(r["interval_start_datetime"] < end for r in rows)
+
+
+def test_invalid_window_raises(sample_file: str):
+    with pytest.raises(ValueError):
+        _stream(sample_file, run_datetime_start="not a date")
+
+
+def test_filename_template_prunes_files(tmp_path, monkeypatch):
+    for day in ("01", "02", "03"):
+        write_regular_grib(
+            str(tmp_path / f"era5_202501{day}.grib"),
+            [{"values": np.ones((2, 2)), "dataDate": int(f"202501{day}")}],
+        )
+
+    opened: list[str] = []
+    original_open = Storage.open
+
+    def tracking_open(self, path, mode="rb"):
+        opened.append(path)
+        return original_open(self, path, mode)
+
+    monkeypatch.setattr(Storage, "open", tracking_open)
+    stream = _stream(
+        str(tmp_path / "era5_*.grib"),
+        filename_datetime_template="era5_{YYYYMMDD}.grib",
+        run_datetime_start="2025-01-02",
+        run_datetime_end="2025-01-03",
+    )
+    rows = list(records(stream))
+
+    assert [p.rsplit("/", 1)[-1] for p in opened] == ["era5_20250102.grib"]
+    assert len(rows) == 4
+
+
+def test_filename_template_kind(tmp_path):
+    # run of 2025-01-01 with a +48h forecast valid on 2025-01-03
+    write_regular_grib(
+        str(tmp_path / "fc_20250101.grib"),
+        [{"values": np.ones((2, 2)), "dataDate": 20250101, "P1": 48}],
+    )
+    options = {
+        "filename_datetime_template": "fc_{YYYYMMDD}.grib",
+        "interval_datetime_start": "2025-01-03",
+        "interval_datetime_end": "2025-01-04",
+    }
+    path = str(tmp_path / "fc_*.grib")
+
+    # the name holds the run date: the interval window must not prune it
+    assert len(list(records(_stream(path, **options)))) == 4
+    assert (
+        list(records(_stream(path, filename_datetime_kind="interval", **options))) == []
+    )